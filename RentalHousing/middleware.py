@@ -1,3 +1,5 @@
+import hashlib
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 from django.http import HttpRequest, HttpResponse
 from datetime import datetime
@@ -98,3 +100,43 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
         """
         request.COOKIES.pop('access_token', None)
         request.COOKIES.pop('refresh_token', None)
+
+
+class VisitorIdMiddleware(MiddlewareMixin):
+    """
+    Anonymous visitor identifier for statistics (views/searches) without touching the session store.
+
+    `request.visitor_id` is read from a signed cookie. A new visitor gets a hash of stable request
+    attributes (IP + User-Agent), so clients without cookies keep the same id; it is then persisted in the cookie.
+    """
+    salt = "visitor-id"
+
+    def process_request(self, request: HttpRequest) -> None:
+        visitor_id = request.get_signed_cookie(settings.VISITOR_COOKIE_NAME, default=None, salt=self.salt)
+        if not visitor_id:
+            visitor_id = self.fingerprint(request)
+            request._new_visitor_id = visitor_id
+        request.visitor_id = visitor_id
+
+    @staticmethod
+    def fingerprint(request: HttpRequest) -> str:
+        source = "|".join([
+            request.META.get("REMOTE_ADDR", ""),
+            request.META.get("HTTP_USER_AGENT", ""),
+            settings.SECRET_KEY,
+        ])
+        return hashlib.sha256(source.encode()).hexdigest()[:32]
+
+    def process_response(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        visitor_id = getattr(request, "_new_visitor_id", None)
+        if visitor_id:
+            response.set_signed_cookie(
+                settings.VISITOR_COOKIE_NAME,
+                visitor_id,
+                salt=self.salt,
+                max_age=settings.VISITOR_COOKIE_AGE,
+                httponly=True,
+                secure=settings.SECURE_SET_COOKIE,
+                samesite="Lax",
+            )
+        return response
@@ -1,7 +1,189 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over the queryset's own ordering + pk as a tie-breaker.
+
+    The cursor stores the ordering values of the boundary row, the next page is
+    `WHERE (f1, f2, ..., pk) > (v1, v2, ..., pk)` (per-field direction) `LIMIT page_size + 1`:
+    no COUNT(*) and no OFFSET, so a deep page costs the same as the first one.
+    NULLs are treated as the smallest values (MySQL/SQLite ordering).
+    """
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self, page_size: int):
+        self.page_size = page_size
+
+    @staticmethod
+    def get_ordering(queryset: QuerySet) -> list[str] | None:
+        """
+        Ordering of a queryset as field names ("-created_at", ...) ending with pk, None if not supported.
+        """
+        ordering = list(queryset.query.order_by or queryset.query.get_meta().ordering or [])
+        if not all(isinstance(field, str) and field not in ("?", "") for field in ordering):
+            return None  # expressions/random ordering
+        if not any(field.lstrip("-") in ("pk", "id") for field in ordering):
+            desc = ordering[-1].startswith("-") if ordering else False
+            ordering.append("-pk" if desc else "pk")
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        position, reverse = self.decode_cursor(request)
+
+        fields = [(field.lstrip("-"), field.startswith("-") != reverse) for field in self.ordering]
+        queryset = queryset.order_by(*[f"-{name}" if desc else name for name, desc in fields])
+        if position is not None:
+            try:
+                position = [self.decode_value(queryset, name, value) for (name, _), value in zip(fields, position)]
+                queryset = queryset.filter(self.after(fields, position))
+            except (TypeError, ValueError, ValidationError):  # forged cursor
+                raise NotFound(self.invalid_cursor_message)
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = rows
+        return rows
+
+    @staticmethod
+    def after(fields: list[tuple[str, bool]], position: list) -> Q:
+        """
+        Lexicographic "row is after position" condition.
+        """
+        condition = Q(pk__in=[])
+        for i, (name, desc) in enumerate(fields):
+            branch = Q()
+            for (prev_name, _), value in zip(fields[:i], position):
+                branch &= Q(**{f"{prev_name}__isnull": True}) if value is None else Q(**{prev_name: value})
+            value = position[i]
+            if desc:  # smaller values (and NULLs) come next
+                if value is None:
+                    continue
+                branch &= Q(**{f"{name}__lt": value}) | Q(**{f"{name}__isnull": True})
+            else:
+                branch &= Q(**{f"{name}__isnull": False}) if value is None else Q(**{f"{name}__gt": value})
+            condition |= branch
+        return condition
+
+    def get_position(self, obj) -> list:
+        position = []
+        for field in self.ordering:
+            value = obj
+            for attr in field.lstrip("-").split("__"):
+                try:
+                    value = getattr(value, attr)
+                except ObjectDoesNotExist:  # missing related row (e.g. listing_stats)
+                    value = None
+                if value is None:
+                    break
+            position.append(self.encode_value(value))
+        return position
+
+    @staticmethod
+    def encode_value(value):
+        if isinstance(value, (datetime, date, time)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        if hasattr(value, "pk"):
+            return value.pk
+        return value
+
+    @staticmethod
+    def decode_value(queryset: QuerySet, name: str, value):
+        """
+        Cursor value converted by its ordering field (model field or annotation); raises on a wrong type.
+        """
+        if value is None:
+            return None
+        if name in queryset.query.annotations:
+            field = queryset.query.annotations[name].output_field
+        else:
+            model, *path = [queryset.model, *name.split("__")]
+            for attr in path[:-1]:
+                model = model._meta.get_field(attr).related_model
+            field = model._meta.pk if path[-1] == "pk" else model._meta.get_field(path[-1])
+        if isinstance(value, (dict, list)):
+            raise TypeError(f"Invalid cursor value for {name}")
+        return field.to_python(value)
+
+    def decode_cursor(self, request) -> tuple[list | None, bool]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            position, reverse, ordering = cursor["p"], bool(cursor["r"]), cursor["o"]
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if ordering != self.ordering or not isinstance(position, list) or len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, obj, reverse: bool) -> str:
+        cursor = {"p": self.get_position(obj), "r": int(reverse), "o": self.ordering}
+        encoded = urlsafe_b64encode(json.dumps(cursor, separators=(",", ":")).encode()).decode("ascii")
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
 
 
 class DefaultPagination(PageNumberPagination):
     page_size = 10                      # дефолт
     page_size_query_param = "page_size" # ?page_size=25
-    max_page_size = 100                 # верхний предел
\ No newline at end of file
+    max_page_size = 100                 # верхний предел
+    mode_query_param = "pagination"     # ?pagination=cursor -> keyset mode (no COUNT/OFFSET)
+
+    keyset = None
+
+    def use_keyset(self, request, queryset) -> bool:
+        if not isinstance(queryset, QuerySet) or KeysetPagination.get_ordering(queryset) is None:
+            return False
+        return (request.query_params.get(self.mode_query_param) == "cursor"
+                or KeysetPagination.cursor_query_param in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request, queryset):
+            self.keyset = KeysetPagination(self.get_page_size(request))
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     'django_filters',
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
+    'apps.core.apps.CoreConfig',
     'apps.bookings.apps.BookingsConfig',
     'apps.users.apps.UsersConfig',
     'apps.reviews.apps.ReviewsConfig',
@@ -57,6 +58,7 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'RentalHousing.middleware.VisitorIdMiddleware',
     'RentalHousing.middleware.CsrfBypassForApi',
     'RentalHousing.middleware.JWTAuthenticationMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -170,6 +172,12 @@ def mysql_conf():
 
 DEFAULT_FROM_EMAIL = "no-reply@example.com"
 
+# Email outbox (apps.core.models.EmailOutbox, drained by `manage.py send_outbox`)
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5       # then the email is DEAD
+EMAIL_OUTBOX_BACKOFF_SECONDS = 60   # retry after 60s, 120s, 240s, ...
+EMAIL_OUTBOX_CLAIM_SECONDS = 300    # claimed emails of a crashed/hanging sender are retried after that
+
 # ALLOWED_HOSTS = env.list("ALLOWED_HOSTS", default=["localhost", "127.0.0.1"] if ENV == "dev" else [])
 if ENV == "prod":
     ALLOWED_HOSTS = [a_hosts.strip() for a_hosts in os.environ.get("ALLOWED_HOSTS", "").split(",") if a_hosts.strip()]
@@ -185,6 +193,29 @@ else:
     DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": BASE_DIR / "db.sqlite3",}}
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# Cache: locmem (single process) | file (shared by the workers of one host) | dotted path of a cache backend
+CACHE_BACKEND = env("CACHE_BACKEND", default="file" if ENV == "prod" else "locmem")
+CACHE_BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+}
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKENDS.get(CACHE_BACKEND, CACHE_BACKEND),
+        "LOCATION": env("CACHE_LOCATION", default=str(BASE_DIR / "cache") if CACHE_BACKEND == "file" else ""),
+    }
+}
+# Lifetime (seconds) of cached GET /api/v1/listings/ responses (invalidated by signals anyway), 0 - off
+LISTING_CACHE_TIMEOUT = env.int("LISTING_CACHE_TIMEOUT", default=60)
+
+# Popular listings leaderboards in the cache (apps/statistics/leaderboard.py, manage.py refresh_leaderboards)
+LEADERBOARD_SIZE = 200  # top N listings per leaderboard
+LEADERBOARD_CITIES = 50  # cities with own leaderboards refreshed on schedule (others are built on demand)
+LEADERBOARD_FRESH_SECONDS = env.int("LEADERBOARD_FRESH_SECONDS", default=60)  # older entries are rebuilt
+LEADERBOARD_STALE_SECONDS = 60 * 60  # ... but served until then (stale-while-revalidate)
+LEADERBOARD_LOCK_SECONDS = 30  # single-flight lock of a rebuild
+LEADERBOARD_WAIT_SECONDS = 2  # a miss waits so long for the rebuild of another worker
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',},
@@ -270,6 +301,36 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 DEFAULT_SPAN_DAYS_MAX = 365
 
+# Bayesian rating of listings: the average is pulled to PRIOR_MEAN as if there were PRIOR_COUNT extra reviews
+RATING_PRIOR_MEAN = 3.0
+RATING_PRIOR_COUNT = 5
+
+# Trending listings: views/bookings decayed with the half-life (ListingStats.trending, log2 of the decayed sum).
+# Changing the half-life makes the stored scores incomparable: reset trending to NULL after a change.
+TRENDING_HALF_LIFE_HOURS = env.float("TRENDING_HALF_LIFE_HOURS", default=24.0)
+TRENDING_VIEW_WEIGHT = 1.0
+TRENDING_BOOKING_WEIGHT = 5.0
+
+# Full-text search of listings: auto | mysql_fulltext | sqlite_fts5 | inverted (see apps/listings/search.py)
+LISTING_SEARCH_BACKEND = env("LISTING_SEARCH_BACKEND", default="auto")
+
+# Statistics write-behind buffers (apps/statistics/buffers.py)
+STATS_BUFFER_SYNC = env.bool("STATS_BUFFER_SYNC", default=False)  # True -> write every event immediately
+STATS_BUFFER_FLUSH_INTERVAL = env.int("STATS_BUFFER_FLUSH_INTERVAL", default=5)  # seconds
+STATS_BUFFER_MAX_SIZE = env.int("STATS_BUFFER_MAX_SIZE", default=500)  # events before an early flush
+STATS_BUFFER_MAX_QUEUE = env.int("STATS_BUFFER_MAX_QUEUE", default=10000)  # events above it are dropped
+SEARCH_DEDUP_SECONDS = 10 * 60  # the same search (fingerprint) of a user/visitor is logged once
+SEARCH_TOPK_CAPACITY = 2000  # keywords monitored by the Space-Saving tracker (error <= searches / capacity)
+SEARCH_TOPK_PUBLISH = 300  # top keywords written to SearchQueryStats
+SEARCH_TOPK_MIN_COUNT = 2  # ... once searched at least this many times (guaranteed count)
+VIEW_DEDUP_SECONDS = 30 * 60  # repeated views of a listing by the same user/visitor are counted once
+LISTING_VIEW_RETENTION_DAYS = 90  # raw ListingView rows, older days are kept as ListingViewDaily (rollup_views)
+LISTING_VIEW_ROLLUP_LAG_MINUTES = 15  # rollup_views re-scans recent views (late commits get ids below the watermark)
+
+# Anonymous visitor id (signed cookie, RentalHousing.middleware.VisitorIdMiddleware)
+VISITOR_COOKIE_NAME = "visitor_id"
+VISITOR_COOKIE_AGE = 365 * 24 * 60 * 60
+
 # STATIC_URL = '/static/'
 # if not DEBUG:
 #     STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:41
+
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_booked_nights(apps, schema_editor):
+    """
+    Nights of APPROVED bookings that are not checked out yet.
+    """
+    Booking = apps.get_model("bookings", "Booking")
+    BookedNight = apps.get_model("bookings", "BookedNight")
+    today = timezone.localdate()
+    nights = []
+    for booking in (Booking.objects.filter(status="approved", end_date__gt=today)
+                    .only("id", "listing_id", "start_date", "end_date").iterator(chunk_size=1000)):
+        nights.extend(
+            BookedNight(listing_id=booking.listing_id, booking_id=booking.id,
+                        night=booking.start_date + timedelta(days=day))
+            for day in range((booking.end_date - booking.start_date).days)
+        )
+        if len(nights) >= 5000:
+            BookedNight.objects.bulk_create(nights, ignore_conflicts=True)
+            nights = []
+    BookedNight.objects.bulk_create(nights, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0013_alter_booking_kitchen_needed_and_more'),
+        ('listings', '0003_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookedNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('night', models.DateField(verbose_name='Night')),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booked_nights', to='bookings.booking', verbose_name='Booking')),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booked_nights', to='listings.listing', verbose_name='Listing')),
+            ],
+            options={
+                'verbose_name': 'Booked night',
+                'verbose_name_plural': 'Booked nights',
+                'constraints': [models.UniqueConstraint(fields=('night', 'listing'), name='uniq_booked_night_listing')],
+            },
+        ),
+        migrations.RunPython(fill_booked_nights, migrations.RunPython.noop),
+    ]
@@ -104,5 +104,56 @@ class Booking(TimeStampedModel):
 
         return super().save(*args, **kwargs)
     
+    @classmethod
+    def recalc_pending_total_cost(cls, listing: Listing) -> list["Booking"]:
+        """
+        Recalculates total_cost of PENDING bookings of a listing with one bulk_update (no per-row save/signals).
+        :return: bookings whose total_cost has changed (with renter loaded)
+        """
+        changed = []
+        queryset = (cls.objects.filter(listing=listing, status=StatusBooking.PENDING.value)
+                    .select_related("renter")
+                    .only("id", "start_date", "end_date", "total_cost", "listing_id", "renter__id", "renter__email"))
+        for booking in queryset:
+            booking.listing = listing
+            total_cost = booking.calc_total_cost()
+            if total_cost != booking.total_cost:
+                booking.total_cost = total_cost
+                booking.updated_at = timezone.now()
+                changed.append(booking)
+        cls.objects.bulk_update(changed, ["total_cost", "updated_at"], batch_size=500)
+        return changed
+
     def __str__(self):
         return f"{self.listing_id}: {self.start_date}-{self.end_date}, {self.status}, {self.total_cost}"
+
+
+class BookedNight(models.Model):
+    """
+    Occupancy index: one row per night of an APPROVED booking (check-out day is free).
+    """
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="booked_nights",
+                                verbose_name=_("Listing"))
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name="booked_nights",
+                                verbose_name=_("Booking"))
+    night = models.DateField(verbose_name=_("Night"))
+
+    class Meta:
+        verbose_name = "Booked night"
+        verbose_name_plural = "Booked nights"
+        constraints = [models.UniqueConstraint(fields=["night", "listing"], name="uniq_booked_night_listing")]
+
+    @classmethod
+    def sync_for(cls, booking: Booking) -> None:
+        """
+        Rewrites the nights of a booking: APPROVED occupies start_date..end_date-1, any other status frees them.
+        """
+        cls.objects.filter(booking_id=booking.pk).delete()
+        if booking.status != StatusBooking.APPROVED.value:
+            return
+        nights = (booking.end_date - booking.start_date).days
+        cls.objects.bulk_create(
+            [cls(listing_id=booking.listing_id, booking_id=booking.pk,
+                 night=booking.start_date + timezone.timedelta(days=day)) for day in range(nights)],
+            ignore_conflicts=True,
+        )
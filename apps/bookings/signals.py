@@ -1,26 +1,52 @@
-from django.db.models.signals import pre_save, post_save
+from django.conf import settings
+from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.db.models import Q
 from django.utils import timezone
 
 from ..core.enums import Roles
 from ..core.utils import get_user_email
-from .models import Booking, StatusBooking
+from .models import Booking, BookedNight, StatusBooking
 from ..core.mails import send_safe_mail
+from ..statistics.models import ListingStats, ListingFunnelDaily
 
-@receiver(pre_save, sender=Booking)
-def task_pre_save_capture_old_status(sender, instance: Booking, **kwargs):
+CRITICAL_STATUSES = {StatusBooking.APPROVED.value, StatusBooking.CANCELLED.value}
+
+@receiver(post_save, sender=Booking)
+def sync_booked_nights(sender, instance: Booking, created, update_fields, **kwargs):
+    """
+    Keeps the occupancy index (BookedNight) in sync with APPROVED bookings.
+    """
+    if not created and update_fields is not None and not {"status", "start_date", "end_date"} & set(update_fields):
+        return
+    if created and instance.status != StatusBooking.APPROVED.value:
+        return
+    BookedNight.sync_for(instance)
+
+@receiver(post_save, sender=Booking)
+def add_booking_to_trending(sender, instance: Booking, created, **kwargs):
+    """
+    A new booking raises the trending score of the listing.
+    """
+    if created:
+        ListingStats.add_trending({instance.listing_id: settings.TRENDING_BOOKING_WEIGHT},
+                                  {instance.listing_id: instance.listing.is_active})
+
+FUNNEL_STATUSES = {StatusBooking.APPROVED.value: "bookings_approved",
+                   StatusBooking.COMPLETED.value: "bookings_completed"}
+
+@receiver(post_save, sender=Booking)
+def update_listing_funnel(sender, instance: Booking, created, **kwargs):
     """
-    Before saving, we read its previous status from the database and put it in _old_status
+    Counts created bookings and status changes to APPROVED/COMPLETED in the daily funnel of the listing.
     """
-    if instance.pk:
-        try:
-            old = Booking.objects.get(pk=instance.pk)
-            instance._old_status = old.status
-        except Booking.DoesNotExist:
-            instance._old_status = None
-    else:
-        instance._old_status = None
+    events = {"bookings_created": 1} if created else {}
+    if created or instance.old_value("status") != instance.status:
+        counter = FUNNEL_STATUSES.get(instance.status)
+        if counter:
+            events[counter] = 1
+    if events:
+        ListingFunnelDaily.add_events(timezone.localdate(), {instance.listing_id: events})
 
 @receiver(post_save, sender=Booking)
 def decline_overlapping_pending_on_status_approve(sender, instance: Booking, created, update_fields, **kwargs):
@@ -53,6 +79,7 @@ def send_email_to(sender, instance: Booking, created, update_fields, **kwargs):
     to_renter_email = get_user_email(instance, Roles.RENTER)
     to_lessor_email = get_user_email(instance, Roles.LESSOR)
     if to_renter_email or to_lessor_email:
+        critical = False
         if created:
             subject_to_renter = f"You have by user '{to_lessor_email}' booked housing."
             subject_to_lessor = (f"Your housing has been booked by user '{to_renter_email}'.")
@@ -60,8 +87,10 @@ def send_email_to(sender, instance: Booking, created, update_fields, **kwargs):
                        f"from {instance.start_date.isoformat()} to {instance.end_date.isoformat()} "
                        f"(total cost: {instance.total_cost}) has been created.")
         else:
-            old_status = getattr(instance, "_old_status", None)
+            old_status = instance.old_value("status")
             new_status = instance.status
+            # delivered immediately also to the recipients in digest mode
+            critical = new_status != old_status and new_status in CRITICAL_STATUSES
             subject_to_renter = subject_to_lessor = \
                 f"The reservation status changed from '{old_status}' to '{new_status}'" if new_status != old_status \
                     else "Booking has been changed."
@@ -69,7 +98,7 @@ def send_email_to(sender, instance: Booking, created, update_fields, **kwargs):
                        f"Current state: from {instance.start_date.isoformat()} to {instance.end_date.isoformat()}, "
                        f"total cost: {instance.total_cost}, status: {instance.status}.")
         if to_renter_email:
-            _ = send_safe_mail(subject_to_renter, message, to_renter_email)
+            _ = send_safe_mail(subject_to_renter, message, to_renter_email, critical=critical)
         if to_lessor_email:
-            _ = send_safe_mail(subject_to_lessor, message, to_lessor_email)
+            _ = send_safe_mail(subject_to_lessor, message, to_lessor_email, critical=critical)
 
@@ -0,0 +1,19 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .enums import StatusEmail
+from .models import EmailOutbox
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ("to_email", "subject", "status", "attempts", "next_attempt_at", "sent_at", "created_at")
+    list_filter = ("status",)
+    search_fields = ("to_email", "subject")
+    actions = ("retry",)
+
+    @admin.action(description="Retry sending")
+    def retry(self, request, queryset):
+        updated = queryset.exclude(status=StatusEmail.SENT).update(
+            status=StatusEmail.PENDING, attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f"Queued again: {updated}")
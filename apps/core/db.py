@@ -0,0 +1,76 @@
+"""
+Database helpers.
+"""
+from django.db import connections, router, transaction, IntegrityError
+from django.db.models import F
+
+UPSERT_MAX_PARAMS = 999  # SQLite builds with the old SQLITE_MAX_VARIABLE_NUMBER
+
+
+def upsert_increment(model, rows: list[dict], conflict_fields: list[str], increments: list[str],
+                     updates: list[str] = ()) -> None:
+    """
+    Inserts rows or, if a row with the same conflict_fields exists, adds the row values of `increments`
+    to the stored ones and overwrites `updates` - one statement per batch of rows:
+    - MySQL: INSERT ... ON DUPLICATE KEY UPDATE c = c + VALUES(c)
+    - SQLite/PostgreSQL: INSERT ... ON CONFLICT (...) DO UPDATE SET c = t.c + excluded.c
+    - other: UPDATE, INSERT if nothing was updated (per row).
+
+    :param rows: [{field name: value}], missing fields get their defaults (auto_now/auto_now_add as on save)
+    :param conflict_fields: fields of a unique constraint (or the primary key)
+    """
+    if not rows:
+        return
+    using = router.db_for_write(model)
+    connection = connections[using]
+    if connection.vendor not in ("mysql", "sqlite", "postgresql"):
+        _upsert_increment_fallback(model, rows, conflict_fields, increments, updates, using)
+        return
+
+    meta = model._meta
+    fields = [field for field in meta.concrete_fields if not (field.primary_key and field.auto_created)]
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+    columns = {field.name: quote(field.column) for field in fields}
+    placeholders = "(" + ", ".join(["%s"] * len(fields)) + ")"
+    if connection.vendor == "mysql":
+        assignments = [f"{columns[name]} = {columns[name]} + VALUES({columns[name]})" for name in increments]
+        assignments += [f"{columns[name]} = VALUES({columns[name]})" for name in updates]
+        conflict = "ON DUPLICATE KEY UPDATE " + ", ".join(assignments)
+    else:
+        assignments = [f"{columns[name]} = {table}.{columns[name]} + excluded.{columns[name]}" for name in increments]
+        assignments += [f"{columns[name]} = excluded.{columns[name]}" for name in updates]
+        target = ", ".join(quote(meta.get_field(name).column) for name in conflict_fields)
+        conflict = f"ON CONFLICT ({target}) DO UPDATE SET " + ", ".join(assignments)
+
+    params = []
+    for values in rows:
+        obj = model(**values)
+        params.append([field.get_db_prep_save(field.pre_save(obj, add=True), connection) for field in fields])
+
+    batch_size = max(1, UPSERT_MAX_PARAMS // len(fields))
+    with transaction.atomic(using=using, savepoint=False), connection.cursor() as cursor:
+        for start in range(0, len(params), batch_size):
+            batch = params[start:start + batch_size]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns.values())}) VALUES "
+                f"{', '.join([placeholders] * len(batch))} {conflict}",
+                [value for row in batch for value in row],
+            )
+
+
+def _upsert_increment_fallback(model, rows, conflict_fields, increments, updates, using) -> None:
+    meta = model._meta
+    manager = model._default_manager.using(using)
+    for values in rows:
+        obj = model(**values)
+        lookup = {meta.get_field(name).attname: getattr(obj, meta.get_field(name).attname) for name in conflict_fields}
+        changes = {name: F(name) + values[name] for name in increments}
+        changes.update({name: meta.get_field(name).pre_save(obj, add=False) for name in updates})
+        if manager.filter(**lookup).update(**changes):
+            continue
+        try:
+            with transaction.atomic(using=using):
+                obj.save(using=using, force_insert=True)
+        except IntegrityError:  # inserted concurrently
+            manager.filter(**lookup).update(**changes)
@@ -30,3 +30,14 @@ class StatusBooking(models.TextChoices):
     COMPLETED = "completed", _("Completed")  # завершено
 
 
+class StatusEmail(models.TextChoices):
+    PENDING  = "pending",  _("Pending")   # waiting for (next) sending attempt
+    SENT     = "sent",     _("Sent")
+    DEAD     = "dead",     _("Dead")      # attempts exhausted
+    HELD     = "held",     _("Held")      # waiting for the digest of the recipient
+    DIGESTED = "digested", _("Digested")  # sent as a part of a digest
+
+
+class NotificationMode(models.TextChoices):
+    IMMEDIATE = "immediate", _("Immediate")  # one email per event
+    DIGEST    = "digest",    _("Digest")     # one summary every digest_minutes, critical events immediately
@@ -1,33 +1,164 @@
 import logging
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .enums import StatusEmail, NotificationMode
 
 logger = logging.getLogger(__name__)
 DEFAULT_FROM = getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@example.com")
 
-def send_safe_mail(subject: str, message: str, to_email: str) -> bool:
+def send_safe_mail(subject: str, message: str, to_email: str, critical: bool = False) -> bool:
     """
-    Sends a single email.
+    Queues a single email in the outbox (written in the current transaction, sent by `manage.py send_outbox`).
 
     :param subject: subject
     :param message: message
     :param to_email: email address
+    :param critical: send immediately even if the recipient gets digests
     :return: Returns True on success. Otherwise, log errors and return False.
     """
+    from .models import EmailOutbox
+
     if not to_email:
         return False
     try:
-        sent = send_mail(
-            subject=subject,
-            message=message,
-            from_email=DEFAULT_FROM,
-            recipient_list=[to_email],
-            fail_silently=True,
-        )
-        if not sent:
-            logger.warning("Email not sent (send_mail returned 0). to=%s subject=%r", to_email, subject)
-            return False
+        EmailOutbox.objects.create(subject=subject[:255], message=message, to_email=to_email, critical=critical)
         return True
     except Exception as exc:
-        logger.exception("Failed to send email. to=%s subject=%r error=%s", to_email, subject, exc)
-        return False
\ No newline at end of file
+        logger.exception("Failed to queue email. to=%s subject=%r error=%s", to_email, subject, exc)
+        return False
+
+
+def digest_recipients(emails: set[str]) -> dict[str, int]:
+    """
+    {email: digest_minutes} of the recipients in digest mode.
+    """
+    if not emails:
+        return {}
+    return dict(get_user_model().objects
+                .filter(email__in=emails, notification_mode=NotificationMode.DIGEST)
+                .values_list("email", "digest_minutes"))
+
+
+def compose_digests() -> int:
+    """
+    Replaces the HELD emails of every recipient whose digest interval has passed (since the oldest one)
+    by one summary email. Recipients that left digest mode get their summary at once.
+    :return: number of queued digests
+    """
+    from .models import EmailOutbox
+
+    held = (EmailOutbox.objects.filter(status=StatusEmail.HELD)
+            .values("to_email").annotate(first=Min("created_at")).order_by())
+    held = {row["to_email"]: row["first"] for row in held}
+    intervals = digest_recipients(set(held))
+    now = timezone.now()
+    composed = 0
+    for to_email, first in held.items():
+        if first + timezone.timedelta(minutes=intervals.get(to_email, 0)) > now:
+            continue
+        with transaction.atomic():
+            emails = list(EmailOutbox.objects.select_for_update()
+                          .filter(status=StatusEmail.HELD, to_email=to_email).order_by("created_at", "id"))
+            if not emails:
+                continue
+            message = "\n\n".join(
+                f"[{timezone.localtime(email.created_at):%Y-%m-%d %H:%M}] {email.subject}\n{email.message}"
+                for email in emails)
+            EmailOutbox.objects.create(subject=f"Your notifications: {len(emails)}", message=message,
+                                       to_email=to_email, critical=True)
+            EmailOutbox.objects.filter(pk__in=[email.pk for email in emails]).update(
+                status=StatusEmail.DIGESTED, updated_at=now)
+            composed += 1
+    return composed
+
+
+def send_outbox(batch_size: int | None = None) -> dict:
+    """
+    Sends one batch of due outbox emails over a single connection.
+
+    The batch is claimed in a short transaction (attempt counted, next_attempt_at moved by
+    EMAIL_OUTBOX_CLAIM_SECONDS) and sent outside of it, so no row lock is held while talking to the relay.
+    Not critical emails of the recipients in digest mode are HELD for compose_digests().
+    A failed email (or a failed connection) is retried after EMAIL_OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1),
+    after EMAIL_OUTBOX_MAX_ATTEMPTS attempts it becomes DEAD.
+    :return: {"sent": n, "retry": n, "dead": n, "held": n}
+    """
+    from .models import EmailOutbox
+
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    result = {"sent": 0, "retry": 0, "dead": 0, "held": 0}
+    with transaction.atomic():
+        queryset = (EmailOutbox.objects
+                    .filter(status=StatusEmail.PENDING, next_attempt_at__lte=timezone.now())
+                    .order_by("next_attempt_at", "id"))
+        # several workers: each one takes its own rows (MySQL 8 / PostgreSQL)
+        queryset = queryset.select_for_update(skip_locked=True)
+        emails = list(queryset[:batch_size])
+        if not emails:
+            return result
+
+        digest = digest_recipients({email.to_email for email in emails if not email.critical})
+        held = [email for email in emails if not email.critical and email.to_email in digest]
+        if held:
+            EmailOutbox.objects.filter(pk__in=[email.pk for email in held]).update(
+                status=StatusEmail.HELD, updated_at=timezone.now())
+            result["held"] = len(held)
+            emails = [email for email in emails if email.critical or email.to_email not in digest]
+        if not emails:
+            return result
+
+        now = timezone.now()
+        for email in emails:
+            email.attempts += 1
+            email.next_attempt_at = now + timezone.timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_SECONDS)
+            email.updated_at = now
+        EmailOutbox.objects.bulk_update(emails, ["attempts", "next_attempt_at", "updated_at"])
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        logger.warning("Email connection failed. emails=%s error=%s", len(emails), exc)
+        for email in emails:
+            _attempt_failed(email, exc, result)
+    else:
+        try:
+            for email in emails:
+                try:
+                    EmailMessage(email.subject, email.message, DEFAULT_FROM, [email.to_email],
+                                 connection=connection).send()
+                except Exception as exc:
+                    _attempt_failed(email, exc, result)
+                else:
+                    email.status = StatusEmail.SENT
+                    email.sent_at = timezone.now()
+                    email.last_error = ""
+                    result["sent"] += 1
+                email.updated_at = timezone.now()
+        finally:
+            connection.close()
+    EmailOutbox.objects.bulk_update(
+        emails, ["status", "attempts", "next_attempt_at", "sent_at", "last_error", "updated_at"])
+    return result
+
+
+def _attempt_failed(email, exc: Exception, result: dict) -> None:
+    """
+    Schedules the retry of a failed (already counted) attempt or marks the email DEAD.
+    """
+    email.last_error = str(exc)[:1000]
+    email.updated_at = timezone.now()
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = StatusEmail.DEAD
+        result["dead"] += 1
+        logger.error("Email is dead. to=%s subject=%r error=%s", email.to_email, email.subject, exc)
+    else:
+        delay = settings.EMAIL_OUTBOX_BACKOFF_SECONDS * 2 ** (email.attempts - 1)
+        email.next_attempt_at = timezone.now() + timezone.timedelta(seconds=delay)
+        result["retry"] += 1
+        logger.warning("Email not sent, retry in %ss. to=%s error=%s", delay, email.to_email, exc)
@@ -0,0 +1,51 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.core.mails import send_outbox, compose_digests
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Send queued emails of the outbox in batches over one SMTP connection (--loop: run as a worker)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--loop", action="store_true", help="Keep polling the outbox")
+        parser.add_argument("--interval", type=float, default=5, help="Seconds between polls when idle")
+
+    def handle(self, *args, **opts):
+        while True:
+            close_old_connections()
+            try:
+                result = self.drain(opts["batch_size"])
+            except Exception:  # mail server/database unavailable: retry the whole batch later
+                if not opts["loop"]:
+                    raise
+                logger.exception("Outbox batch failed")
+                result = None
+            if not opts["loop"]:
+                return
+            if not result:
+                time.sleep(opts["interval"])
+
+    def drain(self, batch_size) -> dict:
+        """
+        Composes due digests, then sends batches until nothing is due.
+        """
+        total = {"sent": 0, "retry": 0, "dead": 0, "held": 0}
+        digests = compose_digests()
+        while True:
+            result = send_outbox(batch_size)
+            if not any(result.values()):
+                break
+            for key, value in result.items():
+                total[key] += value
+        if digests or any(total.values()):
+            self.stdout.write(self.style.SUCCESS(
+                f"digests: {digests}, sent: {total['sent']}, held: {total['held']}, "
+                f"retry: {total['retry']}, dead: {total['dead']}"))
+        return total if digests or any(total.values()) else None
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailoutbox',
+            name='critical',
+            field=models.BooleanField(default=False, help_text='Sent immediately even to the recipients in digest mode', verbose_name='Critical'),
+        ),
+        migrations.AlterField(
+            model_name='emailoutbox',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('dead', 'Dead'), ('held', 'Held'), ('digested', 'Digested')], default='pending', max_length=10, verbose_name='Status'),
+        ),
+    ]
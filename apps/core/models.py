@@ -1,12 +1,90 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-class TimeStampedModel(models.Model):
+from .enums import StatusEmail
+
+
+class FieldTrackerMixin:
+    """
+    Remembers the field values as loaded from the database (from_db) or as last saved,
+    so that signal receivers know the previous values without an extra SELECT.
+
+    Values are kept by attname ("is_active", "listing_id"); not loaded (deferred) fields are not tracked.
+    The snapshot is refreshed after save(), i.e. post_save receivers still see the previous values.
+    """
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def old_value(self, field_name: str):
+        """
+        Value of the field before the changes (None for a new instance or a not loaded field).
+        """
+        return getattr(self, "_loaded_values", {}).get(self._meta.get_field(field_name).attname)
+
+    @property
+    def changed_fields(self) -> set[str]:
+        """
+        Names of the loaded fields whose current value differs from the loaded/saved one.
+        """
+        changed = set()
+        loaded = getattr(self, "_loaded_values", {})
+        for field in self._meta.concrete_fields:
+            if field.attname in loaded and loaded[field.attname] != getattr(self, field.attname):
+                changed.add(field.name)
+        return changed
+
+    def has_changed(self, field_name: str) -> bool:
+        return field_name in self.changed_fields
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        loaded = getattr(self, "_loaded_values", {})
+        deferred = self.get_deferred_fields()
+        for field in self._meta.concrete_fields:
+            if field.attname in deferred:
+                continue
+            if update_fields is None or field.name in update_fields or field.attname in update_fields \
+                    or field.attname not in loaded:
+                loaded[field.attname] = getattr(self, field.attname)
+        self._loaded_values = loaded
+
+
+class TimeStampedModel(FieldTrackerMixin, models.Model):
     """
-    Abstract model that provides created_at and updated_at timestamps.
+    Abstract model that provides created_at and updated_at timestamps and field-change tracking.
     """
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created at"))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated at"))
 
     class Meta:
-        abstract = True
\ No newline at end of file
+        abstract = True
+
+
+class EmailOutbox(TimeStampedModel):
+    """
+    Email queued in the transaction of the event, sent by `manage.py send_outbox`.
+    """
+    to_email = models.EmailField(verbose_name=_("To email"))
+    subject = models.CharField(max_length=255, verbose_name=_("Subject"))
+    message = models.TextField(verbose_name=_("Message"))
+    status = models.CharField(max_length=10, choices=StatusEmail.choices, default=StatusEmail.PENDING,
+                              verbose_name=_("Status"))
+    critical = models.BooleanField(default=False, verbose_name=_("Critical"),
+                                   help_text=_("Sent immediately even to the recipients in digest mode"))
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_("Attempts"))
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name=_("Next attempt at"))
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Sent at"))
+    last_error = models.TextField(blank=True, verbose_name=_("Last error"))
+
+    class Meta:
+        verbose_name = "Email outbox"
+        verbose_name_plural = "Email outbox"
+        indexes = [models.Index(fields=["status", "next_attempt_at"], name="outbox_status_next_idx")]
+
+    def __str__(self):
+        return f"{self.to_email}: {self.subject} ({self.status})"
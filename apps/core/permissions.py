@@ -16,6 +16,11 @@ class ListingChangeDeletePermission(BasePermission):
         return is_admin(user) or (is_lessor(user) and obj.owner_id == user.id)
 
 
+class AdminOnlyPermission(BasePermission):
+    def has_permission(self, request, view):
+        return is_admin(request.user)
+
+
 class BookingCreatePermission(BasePermission):
     def has_permission(self, request, view):
         return is_renter(request.user) or is_admin(request.user)
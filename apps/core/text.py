@@ -0,0 +1,170 @@
+import hashlib
+import json
+import re
+import unicodedata
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+WHITESPACE_RE = re.compile(r"\s+", re.UNICODE)
+
+# German umlauts are folded to their two-letter spelling ("München" == "Muenchen")
+UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+# stop words in folded form (see normalize_text)
+STOP_WORDS = frozenset({
+    # de
+    "der", "die", "das", "den", "dem", "des", "ein", "eine", "einer", "eines", "einem", "einen",
+    "und", "oder", "aber", "mit", "ohne", "von", "vom", "zu", "zum", "zur", "im", "am", "an", "auf",
+    "aus", "bei", "fuer", "ueber", "unter", "nach", "vor", "ist", "sind", "nicht", "sehr", "auch",
+    # en
+    "the", "a", "and", "or", "of", "in", "on", "at", "to", "for", "with", "by", "from", "is", "are",
+})
+
+TERM_MAX_LENGTH = 64
+
+
+def normalize_text(text: str) -> str:
+    """
+    Unicode NFKC + case folding + umlaut folding + whitespace collapse.
+    """
+    text = unicodedata.normalize("NFKC", text or "").casefold().translate(UMLAUTS)
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits a text into normalized words without stop words.
+    """
+    return [word for word in WORD_RE.findall(normalize_text(text)) if word not in STOP_WORDS]
+
+
+def normalize_keywords(text: str) -> str:
+    """
+    Search keywords in the form they are counted and cached by: normalized words without stop words.
+
+    Ex: " BERLIN  Mitte " -> "berlin mitte", "Wohnung in München" -> "wohnung muenchen"
+    """
+    return " ".join(tokenize(text))
+
+
+def normalize_params(params: dict) -> dict[str, list[str]]:
+    """
+    {key: sorted normalized values} of query params (a value or a list of values), empty values are dropped.
+    """
+    normalized = {}
+    for key, values in (params or {}).items():
+        values = sorted({normalize_text(str(value)) for value in (values if isinstance(values, list) else [values])}
+                        - {""})
+        if values:
+            normalized[str(key)] = values
+    return normalized
+
+
+def query_fingerprint(keywords: str, params: dict) -> str:
+    """
+    Stable sha1 of a search: normalized keywords + params sorted by key (values as given, sorted).
+    """
+    canonical = [normalize_keywords(keywords),
+                 sorted((str(key), sorted(map(str, values if isinstance(values, list) else [values])))
+                        for key, values in (params or {}).items())]
+    return hashlib.sha1(json.dumps(canonical, ensure_ascii=False).encode()).hexdigest()
+
+
+def search_terms(text: str) -> list[str]:
+    """
+    Tokens of a text reduced to their stems, as stored in the listing search index.
+    """
+    return [stem(word)[:TERM_MAX_LENGTH] for word in tokenize(text)]
+
+
+# German stemmer (Snowball "german2" variant)
+
+VOWELS = frozenset("aeiouyäöü")
+S_ENDINGS = frozenset("bdfghklmnrt")
+ST_ENDINGS = frozenset("bdfghklmnt")
+
+
+def _regions(word: str) -> tuple[int, int]:
+    """
+    R1 - the region after the first non-vowel following a vowel (at least 3 letters before it),
+    R2 - the same region inside R1 (before R1 is moved to 3 letters).
+    """
+    r1 = r2 = len(word)
+    for i in range(1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r2 = i + 1
+            break
+    return max(r1, 3), r2
+
+
+def _longest_suffix(word: str, suffixes: tuple[str, ...]) -> str:
+    for suffix in suffixes:  # suffixes are sorted by length (desc)
+        if word.endswith(suffix):
+            return suffix
+    return ""
+
+
+def stem(word: str) -> str:
+    """
+    Reduces a (normalized) german word to its stem.
+
+    Ex: "Wohnungen" -> "wohnung", "Häuser" -> "haus", "ruhiges" -> "ruhig"
+    """
+    if len(word) < 3 or not word.isalpha():
+        return word
+    # "u" and "y" between vowels are consonants (marked before the umlaut folding: "steuer" keeps its "ue")
+    chars = list(word)
+    for i in range(1, len(chars) - 1):
+        if chars[i] in "uy" and chars[i - 1] in VOWELS and chars[i + 1] in VOWELS:
+            chars[i] = chars[i].upper()
+    word = "".join(chars)
+    # "ae"/"oe"/"ue" back to umlauts, "ß" -> "ss"
+    word = re.sub(r"(?<!q)ue", "ü", word.replace("ß", "ss").replace("ae", "ä").replace("oe", "ö"))
+    r1, r2 = _regions(word)
+
+    # step 1
+    suffix = _longest_suffix(word, ("ern", "em", "er", "en", "es", "e", "s"))
+    if suffix and len(word) - len(suffix) >= r1:
+        if suffix in ("ern", "em", "er"):
+            word = word[:-len(suffix)]
+        elif suffix in ("en", "es", "e"):
+            word = word[:-len(suffix)]
+            if word.endswith("niss"):
+                word = word[:-1]
+        elif len(word) > 1 and word[-2] in S_ENDINGS:
+            word = word[:-1]
+
+    # step 2
+    suffix = _longest_suffix(word, ("est", "en", "er", "st"))
+    if suffix and len(word) - len(suffix) >= r1:
+        if suffix != "st":
+            word = word[:-len(suffix)]
+        elif len(word) >= 6 and word[-3] in ST_ENDINGS:
+            word = word[:-2]
+
+    # step 3 (derivational suffixes)
+    suffix = _longest_suffix(word, ("isch", "lich", "heit", "keit", "end", "ung", "ig", "ik"))
+    if suffix and len(word) - len(suffix) >= r2:
+        base = word[:-len(suffix)]
+        if suffix in ("end", "ung"):
+            word = base
+            if word.endswith("ig") and len(word) - 2 >= r2 and not word.endswith("eig"):
+                word = word[:-2]
+        elif suffix in ("ig", "ik", "isch"):
+            if not base.endswith("e"):
+                word = base
+        elif suffix in ("lich", "heit"):
+            word = base
+            if word.endswith(("er", "en")) and len(word) - 2 >= r1:
+                word = word[:-2]
+        else:  # keit
+            word = base
+            for tail in ("lich", "ig"):
+                if word.endswith(tail) and len(word) - len(tail) >= r2:
+                    word = word[:-len(tail)]
+                    break
+
+    return word.lower().translate(str.maketrans("äöü", "aou"))
@@ -1,13 +1,17 @@
 from django.contrib import admin, messages
 
+from .cache import bump_generation
 from .models import Listing
 from ..bookings.models import Booking
 from ..reviews.models import Review
+from ..statistics.models import ListingStats
 
 
 @admin.action(description="Make selected ACTIVE")
 def make_active(modeladmin, request, queryset):
     updated = queryset.exclude(is_active=True).update(is_active=True)
+    ListingStats.objects.filter(listing__in=queryset).update(is_active=True)
+    bump_generation()
     if updated:
         messages.success(request, f"Set to ACTIVE: {updated}")
     else:
@@ -17,6 +21,8 @@ def make_active(modeladmin, request, queryset):
 @admin.action(description="Make selected INACTIVE")
 def make_inactive(modeladmin, request, queryset):
     updated = queryset.exclude(is_active=False).update(is_active=False)
+    ListingStats.objects.filter(listing__in=queryset).update(is_active=False)
+    bump_generation()
     if updated:
         messages.success(request, f"Set to INACTIVE: {updated}")
     else:
@@ -25,8 +31,12 @@ def make_inactive(modeladmin, request, queryset):
 
 @admin.action(description="Switch status ACTIVE/INACTIVE")
 def toggle_status(modeladmin, request, queryset):
-    made_active = queryset.filter(is_active=False).update(is_active=True)
+    to_activate = list(queryset.filter(is_active=False).values_list("pk", flat=True))
     made_inactive = queryset.filter(is_active=True).update(is_active=False)
+    made_active = queryset.filter(pk__in=to_activate).update(is_active=True)
+    ListingStats.objects.filter(listing__in=queryset).update(is_active=False)
+    ListingStats.objects.filter(listing__in=to_activate).update(is_active=True)
+    bump_generation()
     total = made_active + made_inactive
     if total:
         messages.success(
@@ -0,0 +1,51 @@
+"""
+Response cache of GET /api/v1/listings/.
+
+Key: generation + visibility class + query fingerprint (normalized ?search= + sorted params, + host).
+Any save/delete of Listing, ListingStats or Booking bumps the generation (see signals.py),
+so all cached pages become unreachable at once and expire by LISTING_CACHE_TIMEOUT.
+"""
+import hashlib
+
+from django.core.cache import cache
+
+from ..core.roles import is_admin, is_lessor, is_moderator
+from ..core.text import query_fingerprint
+
+GENERATION_KEY = "listings:generation"
+
+
+def get_generation() -> int:
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 1, timeout=None)
+        generation = cache.get(GENERATION_KEY, 1)
+    return generation
+
+
+def bump_generation() -> None:
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:  # no key yet
+        cache.add(GENERATION_KEY, 1, timeout=None)
+
+
+def visibility_class(request) -> str:
+    """
+    Same classes as ListingViewSet._apply_visibility: anonymous and renter see the same (active) listings.
+    """
+    user = request.user
+    if is_moderator(user) or is_admin(user):
+        return "all"
+    if is_lessor(user):
+        return f"lessor:{user.id}"
+    return "public"
+
+
+def response_cache_key(request) -> str:
+    # ?search= by its normalized keywords (same search terms), other params as given
+    params = {key: values for key, values in request.query_params.lists() if key != "search"}
+    fingerprint = query_fingerprint(request.query_params.get("search", ""), params)
+    # the host is a part of the key: pagination links are absolute
+    digest = hashlib.sha1(f"{request.get_host()}:{fingerprint}".encode()).hexdigest()
+    return f"listings:list:{get_generation()}:{visibility_class(request)}:{digest}"
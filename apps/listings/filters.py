@@ -1,7 +1,29 @@
+from datetime import timedelta
+
 import django_filters as df
+from django import forms
+from django.conf import settings
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
 
 from .models import Listing
+from .search import get_search_backend
+from ..bookings.models import BookedNight
 from ..core.enums import Availability
+from ..core.text import search_terms
+
+class ListingFilterForm(forms.Form):
+    def clean(self):
+        cleaned_data = super().clean()
+        check_in, check_out = cleaned_data.get("check_in"), cleaned_data.get("check_out")
+        if check_in and check_out:
+            if check_out <= check_in:
+                raise forms.ValidationError({"check_out": "check_out must be after check_in."})
+            if (check_out - check_in).days > settings.DEFAULT_SPAN_DAYS_MAX:
+                raise forms.ValidationError(
+                    {"check_out": f"The date range cannot exceed {settings.DEFAULT_SPAN_DAYS_MAX} nights."})
+        return cleaned_data
+
 
 class ListingFilter(df.FilterSet):
     """
@@ -23,14 +45,51 @@ class ListingFilter(df.FilterSet):
     type_housing = df.CharFilter(field_name="type_housing", lookup_expr="iexact")
     is_active = df.BooleanFilter(field_name="is_active")
 
+    check_in = df.DateFilter(method="filter_available")
+    check_out = df.DateFilter(method="filter_available")
+
     class Meta:
         model = Listing
+        form = ListingFilterForm
         fields = []
 
+    def filter_available(self, qs, name, value):
+        """
+        Excludes listings with an APPROVED booking on any night of [check_in, check_out).
+
+        Only one of the dates -> a single night. A single anti-join over the BookedNight (night, listing) index.
+        """
+        check_in = self.form.cleaned_data.get("check_in")
+        check_out = self.form.cleaned_data.get("check_out")
+        if name == "check_out" and check_in:
+            return qs  # already filtered by check_in
+        check_in = check_in or check_out - timedelta(days=1)
+        check_out = check_out or check_in + timedelta(days=1)
+        booked = BookedNight.objects.filter(night__gte=check_in, night__lt=check_out).values("listing_id")
+        return qs.exclude(pk__in=booked)
+
     def filter_choice(self, qs, name, value):
         val = str(value).lower()
         map_ = {"true": "y", "1": "y", "yes": "y",
                 "false": "n", "0": "n", "no": "n",
                 "unknown": "u", "none": "u", "null": "u"}
         c = map_.get(val)
-        return qs if c is None else qs.filter(**{name: c})
\ No newline at end of file
+        return qs if c is None else qs.filter(**{name: c})
+
+
+class ListingSearchFilter(BaseFilterBackend):
+    """
+    Full-text search (?search=...) over the listing search index (see search.py).
+
+    Without explicit ?ordering= the results are sorted by relevance (`search_rank`).
+    """
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        terms = search_terms(request.query_params.get(self.search_param, ""))
+        if not terms:
+            return queryset
+        queryset = get_search_backend().search(queryset, terms)
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+        return queryset.order_by("-search_rank", *queryset.query.order_by)
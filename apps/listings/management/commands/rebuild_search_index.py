@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.listings.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of listings (after bulk imports or a backend switch)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        backend = get_search_backend()
+        total = backend.rebuild(chunk_size=opts["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"[{backend.name}] indexed listings: {total}"))
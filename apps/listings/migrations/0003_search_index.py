@@ -0,0 +1,76 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.utils import OperationalError
+
+FTS5_TABLE = "listings_listing_fts"
+
+
+def create_fulltext(apps, schema_editor):
+    """
+    Vendor-specific full-text structures (see apps/listings/search.py).
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "mysql":
+        schema_editor.execute(
+            "ALTER TABLE listings_listingsearchdocument ADD FULLTEXT INDEX listings_search_fulltext (title, body)")
+    elif vendor == "sqlite":
+        try:
+            schema_editor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS5_TABLE} USING fts5(title, body)")
+        except OperationalError:
+            pass  # SQLite without FTS5 -> inverted index backend
+
+
+def fill_search_index(apps, schema_editor):
+    """
+    Indexes the existing listings. The terms come from the live stemmer on purpose: the index has to match
+    the stemming of the queries, any later change of it needs `manage.py rebuild_search_index` anyway.
+    """
+    from apps.listings.search import get_search_backend
+
+    get_search_backend.cache_clear()  # the FTS5 table has just been created
+    get_search_backend().rebuild(apps.get_model("listings", "Listing").objects.all())
+
+
+def drop_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS5_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0002_rename_baby_crib_max_listing_baby_cribs_max'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingSearchDocument',
+            fields=[
+                ('listing', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='listings.listing', verbose_name='Listing')),
+                ('title', models.TextField(blank=True, verbose_name='Title terms')),
+                ('body', models.TextField(blank=True, verbose_name='Description terms')),
+            ],
+            options={
+                'verbose_name': 'Listing search document',
+                'verbose_name_plural': 'Listing search documents',
+            },
+        ),
+        migrations.CreateModel(
+            name='ListingSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Term')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='Weight')),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='listings.listing', verbose_name='Listing')),
+            ],
+            options={
+                'verbose_name': 'Listing search term',
+                'verbose_name_plural': 'Listing search terms',
+                'constraints': [models.UniqueConstraint(fields=('term', 'listing'), name='uniq_search_term_listing')],
+            },
+        ),
+        migrations.RunPython(create_fulltext, drop_fulltext),
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
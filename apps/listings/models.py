@@ -62,3 +62,41 @@ class Listing(TimeStampedModel):
 
     def __str__(self):
         return f"{self.title} ({self.location})"
+
+
+class ListingSearchDocument(models.Model):
+    """
+    Stemmed title/description of a listing (MySQL FULLTEXT index, see search.py).
+    """
+    listing = models.OneToOneField(
+        Listing,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+        verbose_name=_("Listing")
+    )
+    title = models.TextField(blank=True, verbose_name=_("Title terms"))
+    body = models.TextField(blank=True, verbose_name=_("Description terms"))
+
+    class Meta:
+        verbose_name = "Listing search document"
+        verbose_name_plural = "Listing search documents"
+
+
+class ListingSearchTerm(models.Model):
+    """
+    Inverted index (term -> listing) for databases without a full-text engine.
+    """
+    listing = models.ForeignKey(
+        Listing,
+        on_delete=models.CASCADE,
+        related_name="search_terms",
+        verbose_name=_("Listing")
+    )
+    term = models.CharField(max_length=64, verbose_name=_("Term"))
+    weight = models.PositiveIntegerField(default=1, verbose_name=_("Weight"))
+
+    class Meta:
+        verbose_name = "Listing search term"
+        verbose_name_plural = "Listing search terms"
+        constraints = [models.UniqueConstraint(fields=["term", "listing"], name="uniq_search_term_listing")]
@@ -0,0 +1,187 @@
+"""
+Full-text search over listings (title + description).
+
+The backend is selected by the engine of the default database (settings.LISTING_SEARCH_BACKEND = "auto"):
+- MySQL  -> FULLTEXT index over ListingSearchDocument;
+- SQLite -> FTS5 virtual table (if the SQLite build supports it);
+- other  -> inverted index stored in ListingSearchTerm.
+
+All backends index stemmed terms (apps.core.text.search_terms), so the german morphology ("Wohnungen" / "Wohnung")
+and umlaut spellings ("München" / "Muenchen") are matched the same way everywhere.
+Every search term is required (AND), results are annotated with `search_rank` (higher is better).
+"""
+import math
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, When, F, Sum, Count, Value, FloatField, OuterRef, Subquery
+from django.db.models.expressions import RawSQL
+
+from ..core.text import search_terms
+from .models import Listing, ListingSearchDocument, ListingSearchTerm
+
+FTS5_TABLE = "listings_listing_fts"
+TITLE_WEIGHT = 3  # a term in the title counts as 3 terms in the description
+
+
+class BaseSearchBackend:
+    name = ""
+
+    def index(self, listing: Listing) -> None:
+        raise NotImplementedError
+
+    def remove(self, listing_id: int) -> None:
+        raise NotImplementedError
+
+    def search(self, queryset, terms: list[str]):
+        """
+        :param queryset: Listing queryset
+        :param terms: stemmed terms (search_terms)
+        :return: queryset of matching listings annotated with `search_rank`
+        """
+        raise NotImplementedError
+
+    def rebuild(self, queryset=None, chunk_size: int = 1000) -> int:
+        """
+        Re-indexes listings (all by default). Returns the number of indexed listings.
+        """
+        queryset = queryset if queryset is not None else Listing.objects.all()
+        total = 0
+        for listing in queryset.only("id", "title", "description").iterator(chunk_size=chunk_size):
+            self.index(listing)
+            total += 1
+        return total
+
+
+class InvertedIndexBackend(BaseSearchBackend):
+    """
+    Pure-Python tokenization, postings in ListingSearchTerm (indexed by term).
+
+    Rank: sum of term weights multiplied by the term IDF.
+    """
+    name = "inverted"
+
+    def index(self, listing: Listing) -> None:
+        weights = Counter()
+        for term in search_terms(listing.title):
+            weights[term] += TITLE_WEIGHT
+        for term in search_terms(listing.description):
+            weights[term] += 1
+        ListingSearchTerm.objects.filter(listing_id=listing.pk).delete()
+        ListingSearchTerm.objects.bulk_create(
+            [ListingSearchTerm(listing_id=listing.pk, term=term, weight=weight) for term, weight in weights.items()]
+        )
+
+    def remove(self, listing_id: int) -> None:
+        ListingSearchTerm.objects.filter(listing_id=listing_id).delete()
+
+    def search(self, queryset, terms: list[str]):
+        terms = sorted(set(terms))
+        doc_freq = dict(
+            ListingSearchTerm.objects.filter(term__in=terms).values("term").annotate(df=Count("id"))
+            .values_list("term", "df")
+        )
+        if len(doc_freq) < len(terms):  # some term is not indexed at all
+            return queryset.none()
+        total = cache.get_or_set("listings:search:total", Listing.objects.count, 300) or 1
+        idf = {term: math.log(1 + (total - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+        matches = (
+            ListingSearchTerm.objects.filter(term__in=terms)
+            .values("listing_id")
+            .annotate(
+                hits=Count("term"),
+                rank=Sum(Case(*[When(term=term, then=F("weight") * Value(weight)) for term, weight in idf.items()],
+                              output_field=FloatField())),
+            )
+            .filter(hits=len(terms))
+        )
+        return (queryset.filter(pk__in=matches.values("listing_id"))
+                .annotate(search_rank=Subquery(matches.filter(listing_id=OuterRef("pk")).values("rank")[:1],
+                                               output_field=FloatField())))
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """
+    FTS5 virtual table (rowid = listing id) with BM25 ranking.
+    """
+    name = "sqlite_fts5"
+
+    def index(self, listing: Listing) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS5_TABLE} WHERE rowid = %s", [listing.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS5_TABLE} (rowid, title, body) VALUES (%s, %s, %s)",
+                [listing.pk, " ".join(search_terms(listing.title)), " ".join(search_terms(listing.description))],
+            )
+
+    def remove(self, listing_id: int) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS5_TABLE} WHERE rowid = %s", [listing_id])
+
+    def search(self, queryset, terms: list[str]):
+        expression = " ".join(f'"{term}"' for term in terms)
+        table = Listing._meta.db_table
+        return (
+            queryset
+            .filter(pk__in=RawSQL(f"SELECT rowid FROM {FTS5_TABLE} WHERE {FTS5_TABLE} MATCH %s", [expression]))
+            .annotate(search_rank=RawSQL(
+                f"SELECT -bm25({FTS5_TABLE}, {TITLE_WEIGHT}.0, 1.0) FROM {FTS5_TABLE} "
+                f"WHERE {FTS5_TABLE} MATCH %s AND rowid = {table}.id",
+                [expression], output_field=FloatField()))
+        )
+
+
+class MySQLFullTextBackend(BaseSearchBackend):
+    """
+    InnoDB FULLTEXT index over the stemmed ListingSearchDocument (boolean mode, every term required).
+    """
+    name = "mysql_fulltext"
+
+    def index(self, listing: Listing) -> None:
+        ListingSearchDocument.objects.update_or_create(
+            listing_id=listing.pk,
+            defaults={"title": " ".join(search_terms(listing.title)),
+                      "body": " ".join(search_terms(listing.description))},
+        )
+
+    def remove(self, listing_id: int) -> None:
+        ListingSearchDocument.objects.filter(listing_id=listing_id).delete()
+
+    def search(self, queryset, terms: list[str]):
+        expression = " ".join(f"+{term}" for term in terms)
+        document_table = ListingSearchDocument._meta.db_table
+        table = Listing._meta.db_table
+        match = "MATCH(title, body) AGAINST (%s IN BOOLEAN MODE)"
+        return (
+            queryset
+            .filter(pk__in=RawSQL(f"SELECT listing_id FROM {document_table} WHERE {match}", [expression]))
+            .annotate(search_rank=RawSQL(
+                f"SELECT {match} FROM {document_table} WHERE listing_id = {table}.id",
+                [expression], output_field=FloatField()))
+        )
+
+
+BACKENDS = {backend.name: backend for backend in (InvertedIndexBackend, SQLiteFTS5Backend, MySQLFullTextBackend)}
+
+
+def fts5_table_exists() -> bool:
+    return FTS5_TABLE in connection.introspection.table_names()
+
+
+@lru_cache(maxsize=1)
+def get_search_backend() -> BaseSearchBackend:
+    """
+    Search backend for the active database (see settings.LISTING_SEARCH_BACKEND).
+    """
+    name = getattr(settings, "LISTING_SEARCH_BACKEND", "auto")
+    if name == "auto":
+        if connection.vendor == "mysql":
+            name = MySQLFullTextBackend.name
+        elif connection.vendor == "sqlite" and fts5_table_exists():
+            name = SQLiteFTS5Backend.name
+        else:
+            name = InvertedIndexBackend.name
+    return BACKENDS[name]()
@@ -1,7 +1,9 @@
+from django.core.exceptions import ObjectDoesNotExist
 from rest_framework import serializers
 
 from .models import Listing
 from ..core.enums import Availability
+from ..statistics.models import ListingStats
 
 
 class ListingSerializer(serializers.ModelSerializer):
@@ -10,12 +12,22 @@ class ListingSerializer(serializers.ModelSerializer):
     has_kitchen = serializers.ChoiceField(choices=Availability.choices, required=False)
     parking_available = serializers.ChoiceField(choices=Availability.choices, required=False)
     pets_possible = serializers.ChoiceField(choices=Availability.choices, required=False)
+    rating_histogram = serializers.SerializerMethodField()
 
     class Meta:
         model = Listing
         fields = "__all__"
         read_only_fields = ("owner", "created_at", "updated_at")
 
+    def get_rating_histogram(self, obj) -> dict[str, int]:
+        """
+        Number of valid reviews per star {"1": n, ..., "5": n} (select_related("listing_stats") - no extra query).
+        """
+        try:
+            return obj.listing_stats.rating_histogram
+        except ObjectDoesNotExist:
+            return {str(rating): 0 for rating in ListingStats.RATINGS}
+
     def validate(self, attrs):
         owner = self.context["request"].user
         city = attrs.get("city", getattr(self.instance, "city", "")) or ""
@@ -1,27 +1,23 @@
-from django.db.models.signals import pre_save, post_save, post_delete
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 from ..listings.models import Listing
+from ..listings.search import get_search_backend
+from ..listings.cache import bump_generation
 from ..bookings.models import Booking, StatusBooking
 from ..statistics.models import ListingStats
-from ..reviews.models import Review
 from ..core.enums import Roles
 from ..core.utils import get_user_email
 from ..core.mails import send_safe_mail
 
-@receiver(pre_save, sender=Listing)
-def listing_pre_save_capture_old_status(sender, instance: Listing, **kwargs):
+@receiver([post_save, post_delete], sender=Listing)
+@receiver([post_save, post_delete], sender=ListingStats)
+@receiver([post_save, post_delete], sender=Booking)
+def invalidate_listings_cache(sender, **kwargs):
     """
-    Before saving listing, read the previous status from the database and put it in _old_status
+    Cached listing pages depend on listings, their stats (ordering) and bookings (availability filter)
     """
-    if instance.pk:
-        try:
-            old = Listing.objects.get(pk=instance.pk)
-            instance._old_status = old.is_active
-        except Listing.DoesNotExist:
-            instance._old_status = None
-    else:
-        instance._old_status = None
+    bump_generation()
 
 @receiver(post_save, sender=Listing)
 def send_email_bookings_on_change(sender, instance: Listing, created, update_fields, **kwargs):
@@ -36,8 +32,7 @@ def send_email_bookings_on_change(sender, instance: Listing, created, update_fie
         else:
             subject = f"Listing has been changed."
             message = f"Listing {instance.title} (ID: {instance.id}) has been changed."
-            old_status = getattr(instance, "_old_status", None)
-            if instance.is_active != old_status:
+            if instance.is_active != instance.old_value("is_active"):
                 message += f" New status is {'"INACTIVE"' if instance.is_active else '"ACTIVE"'}."
 
         _ = send_safe_mail(subject, message, to_email)
@@ -45,24 +40,53 @@ def send_email_bookings_on_change(sender, instance: Listing, created, update_fie
 @receiver(post_save, sender=Listing)
 def recalc_total_cost_bookings_on_change(sender, instance: Listing, created, update_fields, **kwargs):
     """
-    Recalculates total_cost if the price changes (only PENDING)
+    Recalculates total_cost if the price changes (only PENDING): one bulk_update and one summary email
+    per lessor and per renter instead of a save + emails per booking
     """
     if created or update_fields and "price" not in update_fields:
         return
-    # Recalculates total_cost if the price changes (only PENDING)
-    queryset = Booking.objects.filter(listing=instance, status=StatusBooking.PENDING.value)
-    for booking in queryset.only("id", "start_date", "end_date", "total_cost", "listing_id"):
-        booking.total_cost = booking.calc_total_cost()
-        booking.save(update_fields=["total_cost"])
+    if instance.old_value("price") == instance.price:
+        return
+    bookings = Booking.recalc_pending_total_cost(instance)
+    if not bookings:
+        return
+
+    subject = f"Price of listing {instance.title} (ID: {instance.id}) has been changed."
+    lines = {}
+    for booking in bookings:
+        lines.setdefault(booking.renter.email, []).append(
+            f"Booking ID: {booking.id} from {booking.start_date.isoformat()} to {booking.end_date.isoformat()}, "
+            f"new total cost: {booking.total_cost}.")
+    for to_email, renter_lines in lines.items():
+        _ = send_safe_mail(subject, "\n".join([f"New price: {instance.price}.", *renter_lines]), to_email)
+    to_lessor_email = get_user_email(instance, Roles.LESSOR)
+    if to_lessor_email:
+        message = "\n".join([f"New price: {instance.price}. Recalculated pending bookings: {len(bookings)}.",
+                              *[line for renter_lines in lines.values() for line in renter_lines]])
+        _ = send_safe_mail(subject, message, to_lessor_email)
 
-@receiver([post_save, post_delete], sender=Review)
-def update_reviews_count(sender, instance, **kwargs):
+@receiver(post_save, sender=Listing)
+def sync_listing_stats(sender, instance: Listing, created, **kwargs):
     """
-    Counts the number of reviews
+    Every listing has a stats row; ListingStats.is_active follows Listing.is_active
     """
-    listing = instance.listing
-    stats, _ = ListingStats.objects.get_or_create(listing=listing)
-    stats.reviews_count = Review.objects.filter(listing=listing).count()
+    if created:
+        ListingStats.objects.get_or_create(listing=instance, defaults={"is_active": instance.is_active})
+    elif instance.is_active != instance.old_value("is_active"):
+        ListingStats.objects.filter(listing=instance).update(is_active=instance.is_active)
 
-    stats.save(update_fields=["reviews_count", "updated_at"])
+@receiver(post_save, sender=Listing)
+def update_search_index(sender, instance: Listing, created, update_fields, **kwargs):
+    """
+    Keeps the full-text index in sync with title/description
+    """
+    if not created and update_fields and not {"title", "description"} & set(update_fields):
+        return
+    get_search_backend().index(instance)
 
+@receiver(post_delete, sender=Listing)
+def remove_from_search_index(sender, instance: Listing, **kwargs):
+    """
+    Removes a deleted listing from the full-text index
+    """
+    get_search_backend().remove(instance.pk)
@@ -5,19 +5,22 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.response import Response
 from rest_framework import status
 from django.utils import timezone
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework.decorators import action
-from django.db.models.functions import Coalesce
-from django.db.models import Q, F, Value, IntegerField, DecimalField
+from django.db.models import Q, F
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiTypes, OpenApiResponse, OpenApiExample
 
 from ..core.enums import StatusBooking
 from ..bookings.models import Booking
 from ..core.permissions import ListingCreatePermission, ListingChangeDeletePermission
 from ..core.roles import is_renter, is_moderator, is_admin, is_lessor
+from ..core.text import normalize_keywords, normalize_params, query_fingerprint
 from .models import Listing
 from .serializers import ListingSerializer
-from .filters import ListingFilter
-from ..statistics.models import ListingView, ListingStats, SearchQuery, SearchQueryStats
+from .filters import ListingFilter, ListingSearchFilter
+from .cache import response_cache_key
+from ..statistics.buffers import view_buffer, search_buffer
 
 
 def user_can_toggle(user):
@@ -26,7 +29,7 @@ def user_can_toggle(user):
 @extend_schema(
     parameters=[
         OpenApiParameter("search", OpenApiTypes.STR, OpenApiParameter.QUERY,
-                         description="Full-text search in title/description"),
+                         description="Full-text search in title/description (sorted by relevance without ordering)"),
         OpenApiParameter("price_min", OpenApiTypes.DECIMAL, OpenApiParameter.QUERY),
         OpenApiParameter("price_max", OpenApiTypes.DECIMAL, OpenApiParameter.QUERY),
         OpenApiParameter("rooms_min", OpenApiTypes.INT, OpenApiParameter.QUERY),
@@ -39,10 +42,16 @@ def user_can_toggle(user):
                          description="Parking availability: y/n/u"),
         OpenApiParameter("pets_possible", OpenApiTypes.STR, OpenApiParameter.QUERY,
                          description="Pets possible: y/n/u"),
+        OpenApiParameter("check_in", OpenApiTypes.DATE, OpenApiParameter.QUERY,
+                         description="Only listings free from check_in (YYYY-MM-DD)"),
+        OpenApiParameter("check_out", OpenApiTypes.DATE, OpenApiParameter.QUERY,
+                         description="... until check_out (YYYY-MM-DD, the check-out day itself stays free)"),
         OpenApiParameter("ordering", OpenApiTypes.STR, OpenApiParameter.QUERY,
                          description="Sort fields. Ex: price,-created_at"),
         OpenApiParameter("all", OpenApiTypes.BOOL, OpenApiParameter.QUERY,
                          description="For lessor: show active + own inactive"),
+        OpenApiParameter("pagination", OpenApiTypes.STR, OpenApiParameter.QUERY,
+                         description="`cursor` - keyset pagination (next/previous links, no count)"),
     ]
 )
 class ListingViewSet(viewsets.ModelViewSet):
@@ -51,8 +60,7 @@ class ListingViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.AllowAny] # read for all
 
     filterset_class = ListingFilter
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter,]
-    search_fields = ["title", "description"]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ListingSearchFilter,]
     ordering_fields = [
         "price",
         "created_at",
@@ -97,13 +105,10 @@ class ListingViewSet(viewsets.ModelViewSet):
         # composite sorts
         if ordering_param in ("popularity", "-popularity"):
             desc = ordering_param.startswith("-")
-            queryset = queryset.annotate(
-                views_cnt=Coalesce(F("listing_stats__views_count"), Value(0), output_field=IntegerField()),
-                reviews_cnt=Coalesce(F("listing_stats__reviews_count"), Value(0), output_field=IntegerField()),
-                popularity=F("views_cnt") * 2 + F("reviews_cnt") * 4,
-            )
+            # materialized ListingStats.popularity, (is_active, popularity) index
+            queryset = queryset.annotate(popularity=F("listing_stats__popularity"))
             # visibility rules for a QuerySet
-            queryset = self._apply_visibility(queryset)
+            queryset = self._apply_visibility(queryset, active_field="listing_stats__is_active")
             return queryset.order_by("-popularity" if desc else "popularity")
 
         # simple sorts
@@ -120,17 +125,20 @@ class ListingViewSet(viewsets.ModelViewSet):
         # visibility rules for a QuerySet
         return self._apply_visibility(queryset)
 
-    def _apply_visibility(self, queryset):
+    def _apply_visibility(self, queryset, active_field="is_active"):
         """
         Sets visibility rules for a QuerySet.
 
         Everyone sees only the ACTIVE status. The owner sees their own and INACTIVE statuses.
+        :param active_field: "listing_stats__is_active" - use the copy of the flag in ListingStats (ranking indexes)
         """
         user = self.request.user
+        active = {active_field: True}
+        inactive = {active_field: False}
 
         # anonymous/RENTER: active only
         if not user.is_authenticated or is_renter(user):
-            return queryset.filter(is_active=True)
+            return queryset.filter(**active)
 
         # MODERATOR/ADMIN: все (active + inactive)
         if is_moderator(user) or is_admin(user):
@@ -141,61 +149,64 @@ class ListingViewSet(viewsets.ModelViewSet):
             all_flag = self.request.query_params.get("all", "").lower() in {"1", "true", "yes", "y"}
             if all_flag:
                 # all active + your own inactive
-                return queryset.filter(Q(is_active=True) | Q(owner_id=user.id, is_active=False))
+                return queryset.filter(Q(**active) | Q(owner_id=user.id, **inactive))
             # default - only your own (active + inactive)
             return queryset.filter(owner_id=user.id)
 
         # default: only active
-        return queryset.filter(is_active=True)
+        return queryset.filter(**active)
 
     def retrieve(self, request, *args, **kwargs):
         """
         Statistics: making a view counter increment.
         """
         instance = self.get_object()
-        session_id = getattr(request, "session", None) and request.session.session_key or ""
-        ListingView.objects.create(
-            listing=instance,
-            user=request.user if (request.user and request.user.is_authenticated) else None,
-            session_id=session_id or "")
-        stats, _ = ListingStats.objects.get_or_create(listing=instance)
-        ListingStats.objects.filter(listing=instance).update(views_count=F("views_count") + 1)
+        # buffered: written in batches by a background flush (see statistics/buffers.py)
+        view_buffer.add_view(
+            instance.pk,
+            request.user.pk if (request.user and request.user.is_authenticated) else None,
+            getattr(request, "visitor_id", ""))
 
-        return super().retrieve(request, *args, **kwargs)
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
 
     def list(self, request, *args, **kwargs):
         """
         Statistics: saves search history.
+
+        Pages are cached per (query string, visibility class), see cache.py.
         """
         queryset = request.query_params
         params = dict(queryset)
-        # keywords
-        keywords = queryset.get("search", "").strip()[:255]
+        # keywords: case/Unicode/umlaut folded, without stop words ("BERLIN " == "berlin")
+        keywords = normalize_keywords(queryset.get("search", ""))[:255]
         # remove unnecessary words from search parameters
         params.pop("page", None)
         params.pop("ordering", None)
+        params.pop("cursor", None)
+        params.pop("pagination", None)
         # cutting out keywords from parameters
         params.pop("search", None)
+        params = normalize_params(params)
         if keywords or params:
-            user = request.user if request.user.is_authenticated else None
-            # save the session id
-            session_id = ""
-            session = getattr(request, "session", None)
-            if session is not None:
-                # create session_key
-                session_id = session.session_key or ""
-                if not session_id:
-                    session.save()  # session.create()
-                    session_id = session.session_key or ""
-            # Search history
-            SearchQuery.objects.create(user=user, session_id=session_id, keywords=keywords, params=params,)
-            # Aggregated statistics by keywords
-            if keywords:
-                obj, created = SearchQueryStats.objects.get_or_create(keywords=keywords, defaults={"count": 1},)
-                if not created:
-                    SearchQueryStats.objects.filter(pk=obj.pk).update(count=F("count") + 1)
-
-        return super().list(request, *args, **kwargs)
+            user_id = request.user.pk if request.user.is_authenticated else None
+            # anonymous visitor id from a signed cookie (VisitorIdMiddleware), no session row is created
+            visitor_id = getattr(request, "visitor_id", "")
+            # Search history + aggregated statistics by keywords: written behind (see statistics/buffers.py),
+            # the same search of a visitor (fingerprint) is logged once per SEARCH_DEDUP_SECONDS
+            search_buffer.add_query(user_id, visitor_id, keywords, params, query_fingerprint(keywords, params))
+
+        timeout = settings.LISTING_CACHE_TIMEOUT
+        if not timeout:
+            return super().list(request, *args, **kwargs)
+        cache_key = response_cache_key(request)
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(cache_key, response.data, timeout)
+        return response
 
     def _find_blocking_booking(self, listing):
         """
@@ -1,27 +1,43 @@
-from django.db.models.aggregates import Avg, Count
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from django.utils import timezone
 
 from ..core.utils import get_user_email
 from ..core.enums import Roles
-from ..statistics.models import ListingStats
+from ..statistics.models import ListingStats, ListingFunnelDaily
 from ..reviews.models import Review
 from ..core.mails import send_safe_mail
 
 
-@receiver([post_save, post_delete], sender=Review)
-def update_reviews_count(sender, instance, **kwargs):
+def counted_rating(rating, is_valid) -> int | None:
     """
-    Counts the number of reviews and averages rating.
+    Rating a review adds to the listing stats (only valid reviews with a rating).
     """
-    listing = instance.listing
-    stats, _ = ListingStats.objects.get_or_create(listing=listing)
-    stats.reviews_count = Review.objects.filter(listing=listing).count()
-    agr = Review.objects.filter(listing=listing, is_valid=True).aggregate(avg=Avg("rating"), cnt=Count("id"))
-    stats.avg_rating = agr["avg"] or 0
-    stats.reviews_count = agr["cnt"] or 0
-
-    stats.save(update_fields=["reviews_count", "avg_rating", "updated_at"])
+    return rating if is_valid and rating is not None else None
+
+
+@receiver(post_save, sender=Review)
+def update_review_stats_on_save(sender, instance: Review, created, update_fields, **kwargs):
+    """
+    Running review counters of the listing: deltas of rating/is_valid, no aggregates over the reviews.
+    """
+    if not created and update_fields is not None and not {"rating", "is_valid"} & set(update_fields):
+        return
+    old_rating = None if created else counted_rating(instance.old_value("rating"), instance.old_value("is_valid"))
+    ListingStats.apply_review_delta(instance.listing_id, reviews=int(created), old_rating=old_rating,
+                                    new_rating=counted_rating(instance.rating, instance.is_valid))
+
+
+@receiver(post_save, sender=Review)
+def update_listing_funnel(sender, instance: Review, created, **kwargs):
+    if created:
+        ListingFunnelDaily.add_events(timezone.localdate(), {instance.listing_id: {"reviews": 1}})
+
+
+@receiver(post_delete, sender=Review)
+def update_review_stats_on_delete(sender, instance: Review, **kwargs):
+    ListingStats.apply_review_delta(instance.listing_id, reviews=-1,
+                                    old_rating=counted_rating(instance.rating, instance.is_valid))
 
 
 @receiver(post_save, sender=Review)
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import ListingView, SearchQuery, SearchQueryStats, ListingStats
+from .models import ListingView, SearchQuery, SearchQueryStats, ListingStats, ListingViewDaily, \
+    ListingFunnelDaily
 
 
 @admin.register(ListingView)
@@ -18,7 +19,21 @@ class _InlineAdmin(admin.ModelAdmin):
 
 @admin.register(ListingStats)
 class ListingStatsAdmin(admin.ModelAdmin):
-    list_display = ("listing", "views_count", "reviews_count", "avg_rating", "updated_at")
+    list_display = ("listing", "views_count", "reviews_count", "avg_rating", "popularity", "rating_score",
+                    "is_active", "updated_at")
     search_fields = ("listing__title",)
 
 
+@admin.register(ListingViewDaily)
+class ListingViewDailyAdmin(admin.ModelAdmin):
+    list_display = ("listing", "day", "views", "unique_sessions", "unique_users", "unique_visitors")
+    search_fields = ("listing__title",)
+    list_filter = ("day",)
+
+
+@admin.register(ListingFunnelDaily)
+class ListingFunnelDailyAdmin(admin.ModelAdmin):
+    list_display = ("listing", "day", "views", "unique_viewers", "bookings_created", "bookings_approved",
+                    "bookings_completed", "reviews")
+    search_fields = ("listing__title",)
+    list_filter = ("day",)
@@ -0,0 +1,306 @@
+"""
+In-process write-behind buffers for statistics.
+
+Events are collected in memory and written by a daemon thread every STATS_BUFFER_FLUSH_INTERVAL seconds
+or as soon as STATS_BUFFER_MAX_SIZE events are waiting. Pending events are flushed on interpreter exit
+(atexit, e.g. a gunicorn worker shutdown). STATS_BUFFER_SYNC = True writes every event immediately (tests).
+
+The queue is bounded by STATS_BUFFER_MAX_QUEUE: when the database can't keep up, new events are dropped
+(and counted) instead of growing the worker memory. Depth/drops/flush latency: buffer_metrics().
+"""
+import atexit
+import copy
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from ..listings.models import Listing
+from .models import ListingView, ListingViewDaily, ListingFunnelDaily, ListingStats, SearchQuery, SearchQueryStats, \
+    SearchParamSet
+from .rollups import add_search_rollups
+from .topk import SpaceSaving
+
+logger = logging.getLogger(__name__)
+
+
+BUFFERS = []
+
+
+class WriteBehindBuffer:
+    """
+    Thread-safe buffer of events; subclasses implement write(items).
+    """
+    name = ""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._items = []
+        self._thread = None
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._seen = {}  # dedup key -> monotonic time of the last accepted event
+        BUFFERS.append(self)
+        atexit.register(self.flush)
+
+    @property
+    def sync(self) -> bool:
+        return getattr(settings, "STATS_BUFFER_SYNC", False)
+
+    @property
+    def max_size(self) -> int:
+        return getattr(settings, "STATS_BUFFER_MAX_SIZE", 500)
+
+    @property
+    def max_queue(self) -> int:
+        return getattr(settings, "STATS_BUFFER_MAX_QUEUE", 10000)
+
+    @property
+    def flush_interval(self) -> float:
+        return getattr(settings, "STATS_BUFFER_FLUSH_INTERVAL", 5)
+
+    @property
+    def dedup_seconds(self) -> float:
+        return 0
+
+    def is_repeated(self, key) -> bool:
+        """
+        True if an event with the key was accepted inside the dedup window, otherwise remembers it.
+        """
+        now = time.monotonic()
+        with self._lock:
+            last_seen = self._seen.get(key)
+            if last_seen is not None and now - last_seen < self.dedup_seconds:
+                return True
+            self._seen[key] = now
+        return False
+
+    def add_once(self, key, item) -> bool:
+        """
+        add() unless an event with the key (None - no dedup) was accepted inside the dedup window.
+        The key of a dropped event is forgotten, so it doesn't suppress the next event.
+        """
+        if key is not None and self.is_repeated(key):
+            return False
+        if self.add(item):
+            return True
+        if key is not None:
+            with self._lock:
+                self._seen.pop(key, None)
+        return False
+
+    def add(self, item) -> bool:
+        """
+        Enqueues an event. Returns False if it was dropped (queue is full).
+        """
+        if self.sync:
+            self._write([item])
+            return True
+        with self._lock:
+            if len(self._items) >= self.max_queue:
+                self.dropped += 1
+                return False
+            self._items.append(item)
+            size = len(self._items)
+        self._ensure_thread()
+        if size >= self.max_size:
+            self._wakeup.set()
+        return True
+
+    def flush(self) -> int:
+        """
+        Writes all pending events. Returns the number of written events.
+        """
+        with self._flush_lock:
+            with self._lock:
+                items, self._items = self._items, []
+            if not items:
+                return 0
+            return self._write(items)
+
+    def _write(self, items: list) -> int:
+        started = time.perf_counter()
+        try:
+            self.write(items)
+        except Exception:
+            logger.exception("Statistics buffer %r: failed to write %s events", self.name, len(items))
+            self.failed += len(items)
+            return 0
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self.written += len(items)
+        return len(items)
+
+    def metrics(self) -> dict:
+        return {
+            "name": self.name,
+            "depth": len(self._items),
+            "max_queue": self.max_queue,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
+
+    def write(self, items: list) -> None:
+        raise NotImplementedError
+
+    def forget_expired(self) -> None:
+        threshold = time.monotonic() - self.dedup_seconds
+        with self._lock:
+            self._seen = {key: seen for key, seen in self._seen.items() if seen >= threshold}
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"stats-buffer-{self.name}", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+def visitor_key(user_id: int | None, visitor_id: str) -> str | None:
+    return f"u:{user_id}" if user_id else (f"v:{visitor_id}" if visitor_id else None)
+
+
+class ViewCounterBuffer(WriteBehindBuffer):
+    """
+    Listing detail views: one bulk_create of ListingView + one upsert of ListingStats counters per flush,
+    the trending scores get the views, the visitors are merged into the HyperLogLog sketches of ListingViewDaily,
+    the daily funnel gets the views and unique viewers.
+
+    Repeated views of a listing by the same user/visitor within VIEW_DEDUP_SECONDS are counted once.
+    """
+    name = "views"
+
+    @property
+    def dedup_seconds(self) -> float:
+        return getattr(settings, "VIEW_DEDUP_SECONDS", 1800)
+
+    def add_view(self, listing_id: int, user_id: int | None, visitor_id: str) -> bool:
+        """
+        Registers a view. Returns False if it is a repeated view inside the dedup window or it was dropped.
+        """
+        visitor = visitor_key(user_id, visitor_id)
+        return self.add_once((listing_id, visitor) if visitor is not None else None, (listing_id, user_id, visitor_id))
+
+    def write(self, items: list) -> None:
+        # one transaction: raw rows, counters, funnel and sketches are written together or not at all
+        with transaction.atomic():
+            # skips views of listings deleted in the meantime
+            active = dict(Listing.objects.filter(pk__in={listing_id for listing_id, _, _ in items})
+                          .values_list("pk", "is_active"))
+            items = [item for item in items if item[0] in active]
+            ListingView.objects.bulk_create(
+                [ListingView(listing_id=listing_id, user_id=user_id, session_id=visitor_id or "")
+                 for listing_id, user_id, visitor_id in items],
+                batch_size=1000,
+            )
+            counts = Counter(listing_id for listing_id, _, _ in items)
+            ListingStats.add_views(counts, active)
+            ListingStats.add_trending({listing_id: count * settings.TRENDING_VIEW_WEIGHT
+                                       for listing_id, count in counts.items()}, active)
+            visitors = defaultdict(set)
+            for listing_id, user_id, visitor_id in items:
+                visitor = visitor_key(user_id, visitor_id)
+                if visitor is not None:
+                    visitors[listing_id].add(visitor)
+            day = timezone.localdate()
+            ListingFunnelDaily.add_events(day, {listing_id: {"views": count} for listing_id, count in counts.items()})
+            ListingFunnelDaily.set_unique_viewers(day, ListingViewDaily.add_visitors(day, visitors))
+        self.forget_expired()
+
+
+class SearchQueryBuffer(WriteBehindBuffer):
+    """
+    Search history: one bulk_create of SearchQuery (params deduplicated in SearchParamSet) + upserts of
+    the hourly/daily search rollups per flush.
+
+    Keywords are counted by a Space-Saving tracker (SEARCH_TOPK_CAPACITY items); only the guaranteed increments
+    of its top SEARCH_TOPK_PUBLISH keywords (searched at least SEARCH_TOPK_MIN_COUNT times) reach SearchQueryStats,
+    so long-tail typos get no rows.
+    """
+    name = "searches"
+
+    def __init__(self):
+        super().__init__()
+        self.top_keywords = SpaceSaving(getattr(settings, "SEARCH_TOPK_CAPACITY", 2000))
+
+    @property
+    def publish_size(self) -> int:
+        return getattr(settings, "SEARCH_TOPK_PUBLISH", 300)
+
+    @property
+    def publish_min_count(self) -> int:
+        return getattr(settings, "SEARCH_TOPK_MIN_COUNT", 2)
+
+    def metrics(self) -> dict:
+        return {
+            **super().metrics(),
+            "topk_capacity": self.top_keywords.capacity,
+            "topk_size": len(self.top_keywords),
+            "topk_total": self.top_keywords.total,
+            "topk_max_error": self.top_keywords.max_error,
+        }
+
+    @property
+    def dedup_seconds(self) -> float:
+        return getattr(settings, "SEARCH_DEDUP_SECONDS", 600)
+
+    def add_query(self, user_id: int | None, visitor_id: str, keywords: str, params: dict, fingerprint: str) -> bool:
+        """
+        Registers a search (normalized keywords/params). Returns False if the visitor repeated the same search
+        (fingerprint) inside the dedup window, e.g. paging through the results.
+        """
+        visitor = visitor_key(user_id, visitor_id)
+        return self.add_once((fingerprint, visitor) if visitor is not None else None,
+                             (user_id, visitor_id, keywords, params, fingerprint))
+
+    def write(self, items: list) -> None:
+        # the tracker is updated on a copy, kept only if the transaction commits
+        top_keywords = copy.deepcopy(self.top_keywords)
+        with transaction.atomic():
+            param_set_ids = SearchParamSet.ids_for([params for _, _, _, params, _ in items])
+            queries = SearchQuery.objects.bulk_create(
+                [SearchQuery(user_id=user_id, session_id=visitor_id or "", keywords=keywords,
+                             fingerprint=fingerprint, param_set_id=param_set_id)
+                 for (user_id, visitor_id, keywords, _, fingerprint), param_set_id in zip(items, param_set_ids)],
+                batch_size=1000,
+            )
+            add_search_rollups((query.created_at, query.keywords, params)
+                               for query, (_, _, _, params, _) in zip(queries, items))
+            for keywords, count in Counter(keywords for _, _, keywords, _, _ in items if keywords).items():
+                top_keywords.offer(keywords, count)
+            SearchQueryStats.add_counts(top_keywords.publish(self.publish_size, self.publish_min_count))
+        self.top_keywords = top_keywords
+        self.forget_expired()
+
+
+def buffer_metrics() -> list[dict]:
+    return [buffer.metrics() for buffer in BUFFERS]
+
+
+view_buffer = ViewCounterBuffer()
+search_buffer = SearchQueryBuffer()
@@ -1,9 +1,6 @@
-import json
-
 import django_filters as df
-from django.db.models.query_utils import Q
 
-from .models import SearchQuery
+from .models import SearchQuery, SearchParamItem, ListingViewDaily, ListingFunnelDaily, normalize_param_value
 
 class SearchQueryFilter(df.FilterSet):
     keyword = df.CharFilter(field_name="keywords", lookup_expr="icontains")
@@ -15,51 +12,34 @@ class SearchQueryFilter(df.FilterSet):
         model = SearchQuery
         fields = []
 
-    def _coerce_value(self, raw: str):
-        """
-        Casts a value from a string to the correct type for JSON comparison.
-        """
-        if raw is None:
-            return None
-        string = str(raw).strip()
-        low = string.lower()
-        # bool
-        if low in ("true", "1", "yes", "y"):
-            return True
-        elif low in ("false","0","no","n"):
-            return False
-
-        # int/float
-        try:
-            return int(string)
-        except ValueError:
-            pass
-        try:
-            return float(string)
-        except ValueError:
-            pass
-        # JSON literals (arrays/objects/numbers/booleans)
-        try:
-            return json.loads(string)
-        except Exception:
-            return string  # string
-
     def filter_param(self, queryset, name, param_key):
         """
-        Filtering by key/value in the params JSON field.
+        Filtering by key/value of the params (index lookup in SearchParamItem).
 
         Requires both param and param_value to be specified.
         """
         param_value = self.data.get("param_value")
         if not param_key or param_value is None:
             return queryset
+        param_sets = SearchParamItem.objects.filter(key=param_key, value_norm=normalize_param_value(param_value))
+        return queryset.filter(param_set__in=param_sets.values("param_set_id"))
+
 
-        value = self._coerce_value(param_value)
+class ListingViewDailyFilter(df.FilterSet):
+    listing = df.NumberFilter(field_name="listing_id")
+    date_from = df.DateFilter(field_name="day", lookup_expr="gte")
+    date_to = df.DateFilter(field_name="day", lookup_expr="lte")
+
+    class Meta:
+        model = ListingViewDaily
+        fields = []
 
-        try:
-            return queryset.filter(**{"params__contains": {param_key: value}})
 
-        except Exception:
-            value_num = f'"{param_key}": {json.dumps(value)}'
-            value_str = f'"{param_key}": "{value}"'
-            return queryset.filter(Q(params__icontains=value_num) | Q(params__icontains=value_str))
+class ListingFunnelFilter(df.FilterSet):
+    listing = df.NumberFilter(field_name="listing_id")
+    date_from = df.DateFilter(field_name="day", lookup_expr="gte")
+    date_to = df.DateFilter(field_name="day", lookup_expr="lte")
+
+    class Meta:
+        model = ListingFunnelDaily
+        fields = []
@@ -0,0 +1,113 @@
+"""
+Materialized top-N of popular listings (global and per city) per visibility class, kept in the cache.
+
+Entries are rebuilt by `manage.py refresh_leaderboards --loop` and served stale-while-revalidate: an entry older
+than LEADERBOARD_FRESH_SECONDS is still returned while one background thread rebuilds it. A lock (cache.add)
+lets only one thread/process rebuild an entry at a time (single flight); concurrent misses wait for its result.
+"""
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from .models import ListingStats
+
+logger = logging.getLogger(__name__)
+
+# visibility classes of PopularListingsViewSet that are materialized (lessor lists are per owner and small)
+VISIBILITY_CLASSES = ("public", "all")
+
+
+def leaderboard_key(visibility: str, city: str = "") -> str:
+    # same folding as the city__iexact filter of build_leaderboard: spellings sharing a key share a result set
+    city = city.strip().lower()
+    return f"leaderboard:popular:{visibility}:{hashlib.sha1(city.encode()).hexdigest() if city else '*'}"
+
+
+def build_leaderboard(visibility: str, city: str = "") -> list[int]:
+    """
+    Listing ids ordered as PopularListingsViewSet, top LEADERBOARD_SIZE.
+    """
+    queryset = ListingStats.objects.order_by("-popularity", "-rating_score", "-listing_id")
+    if visibility == "public":
+        queryset = queryset.filter(is_active=True)
+    if city:
+        queryset = queryset.filter(listing__city__iexact=city.strip())
+    return list(queryset.values_list("listing_id", flat=True)[:settings.LEADERBOARD_SIZE])
+
+
+class LeaderboardIds:
+    """
+    Listing ids of a leaderboard as a paginator sequence. The visibility queryset is applied to the whole
+    cached top-N before paginating; once the leaderboard is full (capped at LEADERBOARD_SIZE), count is the
+    real one and pages past the cached ids come from the database ordering of the queryset.
+    """
+
+    def __init__(self, ids: list[int], queryset):
+        self.queryset = queryset
+        self.capped = len(ids) >= settings.LEADERBOARD_SIZE
+        # listings changed since the build (deactivated/deleted) are dropped
+        visible = set(queryset.filter(pk__in=ids).values_list("pk", flat=True))
+        self.ids = [pk for pk in ids if pk in visible]
+
+    def count(self) -> int:
+        return self.queryset.count() if self.capped else len(self.ids)
+
+    def __getitem__(self, index: slice) -> list[int]:
+        if not self.capped or (index.stop is not None and index.stop <= len(self.ids)):
+            return self.ids[index]
+        return list(self.queryset.values_list("pk", flat=True)[index])
+
+
+def refresh_leaderboard(visibility: str, city: str = "") -> list[int]:
+    ids = build_leaderboard(visibility, city)
+    cache.set(leaderboard_key(visibility, city), {"ids": ids, "built_at": time.time()},
+              timeout=settings.LEADERBOARD_STALE_SECONDS)
+    return ids
+
+
+def get_leaderboard(visibility: str, city: str = "") -> list[int]:
+    """
+    Cached ids (a stale entry is returned and rebuilt in the background), one rebuild on a miss.
+    """
+    key = leaderboard_key(visibility, city)
+    entry = cache.get(key)
+    if entry is not None:
+        if time.time() - entry["built_at"] > settings.LEADERBOARD_FRESH_SECONDS and _lock(key):
+            threading.Thread(target=_refresh_in_background, args=(visibility, city, key), daemon=True).start()
+        return entry["ids"]
+    if _lock(key):
+        try:
+            return refresh_leaderboard(visibility, city)
+        finally:
+            _unlock(key)
+    deadline = time.monotonic() + settings.LEADERBOARD_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry["ids"]
+    # the rebuild of another worker takes too long: answer without storing
+    return build_leaderboard(visibility, city)
+
+
+def _lock(key: str) -> bool:
+    return cache.add(f"{key}:lock", 1, timeout=settings.LEADERBOARD_LOCK_SECONDS)
+
+
+def _unlock(key: str) -> None:
+    cache.delete(f"{key}:lock")
+
+
+def _refresh_in_background(visibility: str, city: str, key: str) -> None:
+    try:
+        refresh_leaderboard(visibility, city)
+    except Exception:
+        logger.exception("Leaderboard %r not refreshed", key)
+    finally:
+        _unlock(key)
+        close_old_connections()
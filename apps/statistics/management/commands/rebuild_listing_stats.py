@@ -0,0 +1,147 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from apps.listings.models import Listing
+from apps.reviews.models import Review
+from apps.statistics.models import ListingView, ListingStats
+from apps.statistics.rollups import views_by_listing
+
+COUNTER_FIELDS = ["views_count", "reviews_count", "rating_sum", "rating_count",
+                  *[f"rating_{rating}" for rating in ListingStats.RATINGS]]
+DERIVED_FIELDS = ["avg_rating", "rating_score", "popularity"]
+
+
+def touched_listing_ids(since) -> set[int]:
+    """
+    Listings with views or reviews created/changed since the moment.
+    """
+    ids = set(ListingView.objects.filter(created_at__gte=since).values_list("listing_id", flat=True).distinct())
+    ids |= set(Review.objects.filter(updated_at__gte=since).values_list("listing_id", flat=True).distinct())
+    return ids
+
+
+def count_sources(listing_ids: list[int]) -> dict[int, dict]:
+    """
+    Counters of a chunk of listings from the source tables (GROUP BY listing), views from raw rows + rollups.
+    """
+    counters = {listing_id: dict.fromkeys(COUNTER_FIELDS, 0) for listing_id in listing_ids}
+    for listing_id, count in views_by_listing(listing_ids).items():
+        counters[listing_id]["views_count"] = count
+    valid = Q(is_valid=True, rating__in=ListingStats.RATINGS)
+    reviews = (Review.objects.filter(listing_id__in=listing_ids).values("listing_id")
+               .annotate(reviews_count=Count("id"),
+                         rating_sum=Sum("rating", filter=valid),
+                         rating_count=Count("id", filter=valid),
+                         **{f"rating_{rating}": Count("id", filter=valid & Q(rating=rating))
+                            for rating in ListingStats.RATINGS})
+               .order_by())
+    for row in reviews:
+        listing_id = row.pop("listing_id")
+        row["rating_sum"] = row["rating_sum"] or 0
+        counters[listing_id].update(row)
+    return counters
+
+
+def listing_chunks(listing_ids, chunk_size: int):
+    """
+    {listing_id: is_active} chunks ordered by id (keyset over all listings or over the given ids).
+    """
+    if listing_ids is not None:
+        listing_ids = sorted(set(listing_ids))
+        for start in range(0, len(listing_ids), chunk_size):
+            chunk = dict(Listing.objects.filter(pk__in=listing_ids[start:start + chunk_size])
+                         .values_list("pk", "is_active"))
+            if chunk:
+                yield chunk
+        return
+    last_pk = 0
+    while True:
+        chunk = dict(Listing.objects.filter(pk__gt=last_pk).order_by("pk").values_list("pk", "is_active")[:chunk_size])
+        if not chunk:
+            return
+        last_pk = max(chunk)
+        yield chunk
+
+
+def rebuild_listing_stats(listing_ids=None, chunk_size: int = 1000, dry_run: bool = False, report=None) -> dict:
+    """
+    Recomputes ListingStats counters chunk by chunk (bounded memory) and writes the changed rows with bulk_update.
+
+    :param listing_ids: only these listings (None - all)
+    :param report: callable(listing_id, field, stored, actual) for every drifted counter
+    :return: {"listings": n, "created": n, "updated": n, "drift": {field: sum of |actual - stored|}}
+    """
+    result = {"listings": 0, "created": 0, "updated": 0, "drift": dict.fromkeys(COUNTER_FIELDS, 0)}
+    for chunk in listing_chunks(listing_ids, chunk_size):
+        result["listings"] += len(chunk)
+        counters = count_sources(list(chunk))
+        stats_rows = {stats.pk: stats for stats in ListingStats.objects.filter(pk__in=chunk)}
+        missing = [ListingStats(listing_id=listing_id, is_active=is_active)
+                   for listing_id, is_active in chunk.items() if listing_id not in stats_rows]
+        changed = []
+        for stats in [*stats_rows.values(), *missing]:
+            drifted = False
+            for field, actual in counters[stats.listing_id].items():
+                stored = getattr(stats, field)
+                if stored != actual:
+                    drifted = True
+                    result["drift"][field] += abs(actual - stored)
+                    if report:
+                        report(stats.listing_id, field, stored, actual)
+                    setattr(stats, field, actual)
+            if drifted and stats.listing_id in stats_rows:
+                stats.refresh_rating()
+                stats.refresh_popularity()
+                stats.updated_at = timezone.now()
+                changed.append(stats)
+        for stats in missing:
+            stats.refresh_rating()
+            stats.refresh_popularity()
+        result["created"] += len(missing)
+        result["updated"] += len(changed)
+        if dry_run:
+            continue
+        with transaction.atomic():
+            ListingStats.objects.bulk_create(missing, ignore_conflicts=True)
+            ListingStats.objects.bulk_update(changed, [*COUNTER_FIELDS, *DERIVED_FIELDS, "updated_at"])
+    return result
+
+
+class Command(BaseCommand):
+    help = ("Recompute ListingStats counters (views, reviews, ratings) from ListingView/Review and report drift. "
+            "--listing / --since: only some listings.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listing", type=int, action="append", dest="listings",
+                            help="Listing id (repeatable)")
+        parser.add_argument("--since", help="Only listings with views/reviews since the date (YYYY-MM-DD) or datetime")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Only report the drift")
+
+    def handle(self, *args, **opts):
+        listing_ids = opts["listings"]
+        if opts["since"]:
+            since = parse_datetime(opts["since"]) or (
+                parse_date(opts["since"]) and datetime.combine(parse_date(opts["since"]), time.min))
+            if not since:
+                raise CommandError(f"Invalid --since: {opts['since']}")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            touched = touched_listing_ids(since)
+            listing_ids = touched if listing_ids is None else touched & set(listing_ids)
+
+        def report(listing_id, field, stored, actual):
+            if opts["verbosity"] > 1:
+                self.stdout.write(f"listing {listing_id}: {field} {stored} -> {actual}")
+
+        result = rebuild_listing_stats(listing_ids, chunk_size=opts["chunk_size"], dry_run=opts["dry_run"],
+                                       report=report)
+        drift = ", ".join(f"{field}: {value}" for field, value in result["drift"].items() if value) or "none"
+        self.stdout.write(self.style.SUCCESS(
+            f"{'[dry run] ' if opts['dry_run'] else ''}listings: {result['listings']}, "
+            f"created: {result['created']}, updated: {result['updated']}; drift: {drift}"))
@@ -0,0 +1,47 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Count
+
+from apps.listings.models import Listing
+from apps.statistics.leaderboard import VISIBILITY_CLASSES, refresh_leaderboard
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ("Rebuild the popular listings leaderboards (global + the cities with most active listings) "
+            "in the cache (--loop: run on a schedule).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cities", type=int, default=settings.LEADERBOARD_CITIES,
+                            help="Number of cities with own leaderboards")
+        parser.add_argument("--loop", action="store_true", help="Keep refreshing")
+        parser.add_argument("--interval", type=float, default=settings.LEADERBOARD_FRESH_SECONDS,
+                            help="Seconds between refreshes")
+
+    def handle(self, *args, **opts):
+        while True:
+            close_old_connections()
+            try:
+                self.refresh(opts["cities"])
+            except Exception:  # database unavailable: next round
+                if not opts["loop"]:
+                    raise
+                logger.exception("Leaderboards not refreshed")
+            if not opts["loop"]:
+                return
+            time.sleep(opts["interval"])
+
+    def refresh(self, cities: int) -> None:
+        top_cities = list(Listing.objects.filter(is_active=True).values_list("city", flat=True)
+                          .annotate(total=Count("id")).order_by("-total", "city")[:cities])
+        for visibility in VISIBILITY_CLASSES:
+            refresh_leaderboard(visibility)
+            for city in top_cities:
+                refresh_leaderboard(visibility, city)
+        self.stdout.write(self.style.SUCCESS(
+            f"leaderboards: {len(VISIBILITY_CLASSES) * (len(top_cities) + 1)} ({len(top_cities)} cities)"))
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.statistics.rollups import rollup_views, purge_views
+
+
+class Command(BaseCommand):
+    help = ("Roll up new ListingView rows into ListingViewDaily (after the watermark) "
+            "and delete rolled up raw views older than the retention.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retention-days", type=int, default=settings.LISTING_VIEW_RETENTION_DAYS,
+                            help="Keep raw views of the last N days (0 - do not delete)")
+        parser.add_argument("--chunk-size", type=int, default=10000, help="Rows per DELETE")
+
+    def handle(self, *args, **opts):
+        result = rollup_views()
+        self.stdout.write(self.style.SUCCESS(f"[rollup] days: {result['days']}, rows: {result['rows']}"))
+        if opts["retention_days"] > 0:
+            deleted = purge_views(opts["retention_days"], chunk_size=opts["chunk_size"])
+            self.stdout.write(self.style.SUCCESS(f"[retention] deleted raw views: {deleted}"))
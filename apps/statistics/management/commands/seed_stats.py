@@ -4,7 +4,9 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from django.db import transaction
 
-from apps.statistics.models import ListingView, SearchQuery
+from apps.core.text import normalize_params, query_fingerprint
+from apps.statistics.models import ListingView, SearchQuery, SearchParamSet
+from apps.statistics.rollups import add_search_rollups
 from apps.listings.models import Listing
 
 User = get_user_model()
@@ -43,7 +45,7 @@ def seed_search_queries(n: int=100, users: Optional[Iterable[User]]=None) -> int
         .distinct()[:20]
     )
     users_list = list(users) if users is not None else list(User.objects.all().only("id"))
-    list_searches = []
+    list_searches, list_params = [], []
     for _ in range(n):
         keyword = random.choice(["luxury", "center", "metro", "park", "lake", "river"])
         params: Dict[str, Any] = {}
@@ -70,14 +72,20 @@ def seed_search_queries(n: int=100, users: Optional[Iterable[User]]=None) -> int
         if random.random() < 0.2:
             params["pets_possible"] = random.choice([True, False])
 
+        params = normalize_params(params)
         list_searches.append(
             SearchQuery(
                 user=random.choice(users_list) if users_list else None,
                 keywords=keyword,
-                params=params,
+                fingerprint=query_fingerprint(keyword, params),
             )
         )
-    created = len(SearchQuery.objects.bulk_create(list_searches, batch_size=500))
+        list_params.append(params)
+    for query, param_set_id in zip(list_searches, SearchParamSet.ids_for(list_params)):
+        query.param_set_id = param_set_id
+    queries = SearchQuery.objects.bulk_create(list_searches, batch_size=500)
+    add_search_rollups((query.created_at, query.keywords, params) for query, params in zip(queries, list_params))
+    created = len(queries)
     return created
 
 
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:44
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_ranking_scores(apps, schema_editor):
+    """
+    Stats row for every listing + materialized popularity / rating_score / is_active.
+    """
+    Listing = apps.get_model("listings", "Listing")
+    ListingStats = apps.get_model("statistics", "ListingStats")
+    ListingStats.objects.bulk_create(
+        [ListingStats(listing_id=pk) for pk in Listing.objects.filter(listing_stats__isnull=True)
+         .values_list("pk", flat=True)],
+        batch_size=1000,
+    )
+    ListingStats.objects.update(popularity=F("views_count") * 2 + F("reviews_count") * 4)
+    ListingStats.objects.filter(listing__is_active=False).update(is_active=False)
+    prior_count = Decimal(settings.RATING_PRIOR_COUNT)
+    prior_mean = Decimal(str(settings.RATING_PRIOR_MEAN))
+    for stats in ListingStats.objects.only("pk", "avg_rating", "reviews_count").iterator(chunk_size=1000):
+        score = ((prior_count * prior_mean + stats.avg_rating * stats.reviews_count)
+                 / (prior_count + stats.reviews_count))
+        stats.rating_score = score.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        stats.save(update_fields=["rating_score"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0003_search_index'),
+        ('statistics', '0002_searchquerystats_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingstats',
+            name='is_active',
+            field=models.BooleanField(default=True, verbose_name='Is active'),
+        ),
+        migrations.AddField(
+            model_name='listingstats',
+            name='popularity',
+            field=models.PositiveIntegerField(default=0, verbose_name='Popularity'),
+        ),
+        migrations.AddField(
+            model_name='listingstats',
+            name='rating_score',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=3, verbose_name='Rating score'),
+        ),
+        migrations.AddIndex(
+            model_name='listingstats',
+            index=models.Index(fields=['is_active', 'popularity', 'rating_score'], name='stats_active_popularity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listingstats',
+            index=models.Index(fields=['is_active', 'rating_score'], name='stats_active_rating_idx'),
+        ),
+        migrations.RunPython(fill_ranking_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:02
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum, Q
+
+
+def fill_review_counters(apps, schema_editor):
+    """
+    rating_sum/rating_count from the valid reviews, reviews_count from all reviews (one GROUP BY).
+    """
+    Review = apps.get_model("reviews", "Review")
+    ListingStats = apps.get_model("statistics", "ListingStats")
+    prior_count = Decimal(settings.RATING_PRIOR_COUNT)
+    prior_mean = Decimal(str(settings.RATING_PRIOR_MEAN))
+    valid = Q(is_valid=True, rating__isnull=False)
+    rows = (Review.objects.values("listing_id")
+            .annotate(total=Count("id"), rating_sum=Sum("rating", filter=valid), rating_count=Count("id", filter=valid))
+            .order_by())
+    for row in rows.iterator(chunk_size=1000):
+        rating_sum, rating_count = row["rating_sum"] or 0, row["rating_count"]
+        avg_rating = Decimal(rating_sum) / rating_count if rating_count else Decimal(0)
+        score = (prior_count * prior_mean + Decimal(rating_sum)) / (prior_count + rating_count)
+        ListingStats.objects.filter(listing_id=row["listing_id"]).update(
+            reviews_count=row["total"],
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            avg_rating=avg_rating.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP),
+            rating_score=score.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP),
+            popularity=models.F("views_count") * 2 + row["total"] * 4,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statistics', '0003_ranking_scores'),
+        ('reviews', '0006_alter_review_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingstats',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Rating count'),
+        ),
+        migrations.AddField(
+            model_name='listingstats',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='Rating sum'),
+        ),
+        migrations.RunPython(fill_review_counters, migrations.RunPython.noop),
+    ]
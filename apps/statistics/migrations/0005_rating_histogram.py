@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:03
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_rating_histogram(apps, schema_editor):
+    """
+    rating_1..rating_5 from the valid reviews (one GROUP BY listing, rating).
+    """
+    Review = apps.get_model("reviews", "Review")
+    ListingStats = apps.get_model("statistics", "ListingStats")
+    histograms = {}
+    rows = (Review.objects.filter(is_valid=True, rating__in=[1, 2, 3, 4, 5])
+            .values_list("listing_id", "rating").annotate(count=Count("id")).order_by())
+    for listing_id, rating, count in rows.iterator(chunk_size=1000):
+        histograms.setdefault(listing_id, {})[f"rating_{rating}"] = count
+    for listing_id, histogram in histograms.items():
+        ListingStats.objects.filter(listing_id=listing_id).update(**histogram)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statistics', '0004_review_counters'),
+        ('reviews', '0006_alter_review_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingstats',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0, verbose_name='1 star reviews'),
+        ),
+        migrations.AddField(
+            model_name='listingstats',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0, verbose_name='2 star reviews'),
+        ),
+        migrations.AddField(
+            model_name='listingstats',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0, verbose_name='3 star reviews'),
+        ),
+        migrations.AddField(
+            model_name='listingstats',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0, verbose_name='4 star reviews'),
+        ),
+        migrations.AddField(
+            model_name='listingstats',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0, verbose_name='5 star reviews'),
+        ),
+        migrations.RunPython(fill_rating_histogram, migrations.RunPython.noop),
+    ]
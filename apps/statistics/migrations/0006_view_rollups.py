@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0003_search_index'),
+        ('statistics', '0005_rating_histogram'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingViewDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Views')),
+                ('unique_sessions', models.PositiveIntegerField(default=0, verbose_name='Unique sessions')),
+                ('unique_users', models.PositiveIntegerField(default=0, verbose_name='Unique users')),
+            ],
+            options={
+                'verbose_name': 'Listing views per day',
+                'verbose_name_plural': 'Listing views per day',
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Name')),
+                ('position', models.BigIntegerField(default=0, verbose_name='Position')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated at')),
+            ],
+            options={
+                'verbose_name': 'Rollup watermark',
+                'verbose_name_plural': 'Rollup watermarks',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='listingview',
+            index=models.Index(fields=['created_at'], name='stats_view_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='listingviewdaily',
+            name='listing',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='views_daily', to='listings.listing', verbose_name='Listing'),
+        ),
+        migrations.AddIndex(
+            model_name='listingviewdaily',
+            index=models.Index(fields=['day'], name='stats_view_daily_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='listingviewdaily',
+            constraint=models.UniqueConstraint(fields=('listing', 'day'), name='uniq_view_daily_listing_day'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:09
+
+import hashlib
+import math
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# frozen copy of apps.statistics.hll as of this migration (p = 10, blake2b), the stored sketch format
+HLL_PRECISION = 10
+CHUNK_SIZE = 5000
+
+
+def hll_add(registers: bytearray, value: str) -> None:
+    hashed = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+    index = hashed >> (64 - HLL_PRECISION)
+    rest = hashed & ((1 << (64 - HLL_PRECISION)) - 1)
+    rank = (64 - HLL_PRECISION) - rest.bit_length() + 1
+    if rank > registers[index]:
+        registers[index] = rank
+
+
+def hll_count(registers: bytearray) -> int:
+    m = len(registers)
+    estimate = 0.7213 / (1 + 1.079 / m) * m * m / sum(2.0 ** -register for register in registers)
+    zeros = registers.count(0)
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * math.log(m / zeros)
+    return round(estimate)
+
+
+def fill_visitor_sketches(apps, schema_editor):
+    """
+    Folds the retained raw views into the daily sketches (visitor = user, else the visitor cookie),
+    chunk by chunk; merging is idempotent.
+    """
+    ListingView = apps.get_model("statistics", "ListingView")
+    ListingViewDaily = apps.get_model("statistics", "ListingViewDaily")
+    visitors = defaultdict(set)
+
+    def flush():
+        if not visitors:
+            return
+        listing_ids, days = {key[0] for key in visitors}, {key[1] for key in visitors}
+        ListingViewDaily.objects.bulk_create(
+            [ListingViewDaily(listing_id=listing_id, day=day) for listing_id, day in visitors], ignore_conflicts=True)
+        rows = [row for row in ListingViewDaily.objects.filter(listing_id__in=listing_ids, day__in=days)
+                if (row.listing_id, row.day) in visitors]
+        for row in rows:
+            registers = bytearray(row.visitors_sketch) if row.visitors_sketch else bytearray(1 << HLL_PRECISION)
+            for visitor in visitors[row.listing_id, row.day]:
+                hll_add(registers, visitor)
+            row.visitors_sketch = bytes(registers)
+            row.unique_visitors = hll_count(registers)
+        ListingViewDaily.objects.bulk_update(rows, ["visitors_sketch", "unique_visitors"], batch_size=500)
+        visitors.clear()
+
+    views = ListingView.objects.values_list("listing_id", "user_id", "session_id", "created_at").order_by("pk")
+    for count, (listing_id, user_id, session_id, created_at) in enumerate(views.iterator(chunk_size=CHUNK_SIZE), 1):
+        visitor = f"u:{user_id}" if user_id else (f"v:{session_id}" if session_id else None)
+        if visitor is not None:
+            visitors[listing_id, timezone.localdate(created_at)].add(visitor)
+        if count % CHUNK_SIZE == 0:
+            flush()
+    flush()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statistics', '0006_view_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingviewdaily',
+            name='unique_visitors',
+            field=models.PositiveIntegerField(default=0, verbose_name='Unique visitors (estimate)'),
+        ),
+        migrations.AddField(
+            model_name='listingviewdaily',
+            name='visitors_sketch',
+            field=models.BinaryField(default=b'', verbose_name='Visitors sketch'),
+        ),
+        migrations.RunPython(fill_visitor_sketches, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:12
+
+from collections import Counter
+from datetime import datetime, time
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_search_rollups(apps, schema_editor):
+    """
+    Hourly/daily rollups of the existing search history (same buckets as rollups.add_search_rollups).
+    The history is read in created_at order and written day by day, so only one day is kept in memory.
+    """
+    SearchQuery = apps.get_model("statistics", "SearchQuery")
+    SearchKeywordRollup = apps.get_model("statistics", "SearchKeywordRollup")
+    SearchParamRollup = apps.get_model("statistics", "SearchParamRollup")
+    keywords, params = Counter(), Counter()
+
+    def flush():
+        SearchKeywordRollup.objects.bulk_create(
+            [SearchKeywordRollup(period=period, bucket=bucket, keywords=kw, count=count)
+             for (period, bucket, kw), count in keywords.items()], batch_size=1000)
+        SearchParamRollup.objects.bulk_create(
+            [SearchParamRollup(period=period, bucket=bucket, key=key, value=value, count=count)
+             for (period, bucket, key, value), count in params.items()], batch_size=1000)
+        keywords.clear()
+        params.clear()
+
+    current_day = None
+    queries = SearchQuery.objects.values_list("created_at", "keywords", "params").order_by("created_at", "pk")
+    for created_at, query_keywords, query_params in queries.iterator(chunk_size=2000):
+        hour = timezone.localtime(created_at).replace(minute=0, second=0, microsecond=0)
+        day = timezone.make_aware(datetime.combine(timezone.localdate(created_at), time.min))
+        if day != current_day:
+            # all hour/day buckets of the previous day are complete
+            flush()
+            current_day = day
+        pairs = set()
+        for key, values in (query_params or {}).items():
+            for value in values if isinstance(values, list) else [values]:
+                pairs.add((str(key)[:50], str(value).strip().lower()[:100]))
+        for period, bucket in (("hour", hour), ("day", day)):
+            keywords[period, bucket, query_keywords] += 1
+            for key, value in pairs:
+                params[period, bucket, key, value] += 1
+    flush()
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statistics', '0007_unique_visitors_sketch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchKeywordRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4, verbose_name='Period')),
+                ('bucket', models.DateTimeField(verbose_name='Bucket start')),
+                ('keywords', models.CharField(max_length=255, verbose_name='Keywords')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Count')),
+            ],
+            options={
+                'verbose_name': 'Search keywords rollup',
+                'verbose_name_plural': 'Search keywords rollups',
+                'constraints': [models.UniqueConstraint(fields=('period', 'bucket', 'keywords'), name='uniq_search_kw_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchParamRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4, verbose_name='Period')),
+                ('bucket', models.DateTimeField(verbose_name='Bucket start')),
+                ('key', models.CharField(max_length=50, verbose_name='Key')),
+                ('value', models.CharField(max_length=100, verbose_name='Value')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Count')),
+            ],
+            options={
+                'verbose_name': 'Search params rollup',
+                'verbose_name_plural': 'Search params rollups',
+                'constraints': [models.UniqueConstraint(fields=('period', 'bucket', 'key', 'value'), name='uniq_search_param_rollup')],
+            },
+        ),
+        migrations.RunPython(fill_search_rollups, migrations.RunPython.noop),
+    ]
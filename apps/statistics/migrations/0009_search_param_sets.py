@@ -0,0 +1,91 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:15
+
+import django.db.models.deletion
+import hashlib
+import json
+
+from django.db import migrations, models
+
+CHUNK_SIZE = 2000
+
+
+def fill_param_sets(apps, schema_editor):
+    """
+    Moves SearchQuery.params into deduplicated SearchParamSet/SearchParamItem rows.
+    """
+    SearchQuery = apps.get_model("statistics", "SearchQuery")
+    SearchParamSet = apps.get_model("statistics", "SearchParamSet")
+    SearchParamItem = apps.get_model("statistics", "SearchParamItem")
+    set_ids = {}
+    pending = {}  # param set id -> query pks, one UPDATE per set and chunk
+
+    def flush():
+        for set_id, pks in pending.items():
+            SearchQuery.objects.filter(pk__in=pks).update(param_set_id=set_id)
+        pending.clear()
+
+    queries = SearchQuery.objects.values_list("pk", "params").order_by("pk")
+    for count, (pk, params) in enumerate(queries.iterator(chunk_size=CHUNK_SIZE), 1):
+        if params:
+            canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+            hash_ = hashlib.sha256(canonical.encode()).hexdigest()
+            if hash_ not in set_ids:
+                param_set = SearchParamSet.objects.create(hash=hash_, params=params)
+                pairs = set()
+                for key, values in params.items():
+                    for value in values if isinstance(values, list) else [values]:
+                        pairs.add((str(key)[:50], str(value).strip().lower()[:100]))
+                SearchParamItem.objects.bulk_create(
+                    [SearchParamItem(param_set=param_set, key=key, value_norm=value) for key, value in pairs])
+                set_ids[hash_] = param_set.pk
+            pending.setdefault(set_ids[hash_], []).append(pk)
+        if count % CHUNK_SIZE == 0:
+            flush()
+    flush()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statistics', '0008_search_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchParamSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.CharField(max_length=64, unique=True, verbose_name='Hash')),
+                ('params', models.JSONField(default=dict, verbose_name='Params')),
+            ],
+            options={
+                'verbose_name': 'Search param set',
+                'verbose_name_plural': 'Search param sets',
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchParamItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, verbose_name='Key')),
+                ('value_norm', models.CharField(max_length=100, verbose_name='Value (normalized)')),
+                ('param_set', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='statistics.searchparamset', verbose_name='Param set')),
+            ],
+            options={
+                'verbose_name': 'Search param item',
+                'verbose_name_plural': 'Search param items',
+                'indexes': [models.Index(fields=['key', 'value_norm', 'param_set'], name='search_param_kv_idx')],
+                'constraints': [models.UniqueConstraint(fields=('param_set', 'key', 'value_norm'), name='uniq_search_param_item')],
+            },
+        ),
+        migrations.AddField(
+            model_name='searchquery',
+            name='param_set',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='queries', to='statistics.searchparamset', verbose_name='Params'),
+        ),
+        migrations.RunPython(fill_param_sets, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='searchquery',
+            name='params',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0003_search_index'),
+        ('statistics', '0009_search_param_sets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingstats',
+            name='trending',
+            field=models.FloatField(blank=True, null=True, verbose_name='Trending score (log2)'),
+        ),
+        migrations.AddIndex(
+            model_name='listingstats',
+            index=models.Index(fields=['is_active', 'trending'], name='stats_active_trending_idx'),
+        ),
+    ]
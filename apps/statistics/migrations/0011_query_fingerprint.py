@@ -0,0 +1,146 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:24
+
+import hashlib
+import json
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# frozen copy of apps.core.text (normalize_keywords, normalize_params, query_fingerprint) as of this migration:
+# later tokenizer changes must not alter it
+CHUNK_SIZE = 2000
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+WHITESPACE_RE = re.compile(r"\s+", re.UNICODE)
+UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+STOP_WORDS = frozenset({
+    "der", "die", "das", "den", "dem", "des", "ein", "eine", "einer", "eines", "einem", "einen",
+    "und", "oder", "aber", "mit", "ohne", "von", "vom", "zu", "zum", "zur", "im", "am", "an", "auf",
+    "aus", "bei", "fuer", "ueber", "unter", "nach", "vor", "ist", "sind", "nicht", "sehr", "auch",
+    "the", "a", "and", "or", "of", "in", "on", "at", "to", "for", "with", "by", "from", "is", "are",
+})
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").casefold().translate(UMLAUTS)
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def normalize_keywords(text: str) -> str:
+    return " ".join(word for word in WORD_RE.findall(normalize_text(text)) if word not in STOP_WORDS)
+
+
+def normalize_params(params: dict) -> dict[str, list[str]]:
+    normalized = {}
+    for key, values in (params or {}).items():
+        values = sorted({normalize_text(str(value)) for value in (values if isinstance(values, list) else [values])}
+                        - {""})
+        if values:
+            normalized[str(key)] = values
+    return normalized
+
+
+def query_fingerprint(keywords: str, params: dict) -> str:
+    canonical = [normalize_keywords(keywords),
+                 sorted((str(key), sorted(map(str, values if isinstance(values, list) else [values])))
+                        for key, values in (params or {}).items())]
+    return hashlib.sha1(json.dumps(canonical, ensure_ascii=False).encode()).hexdigest()
+
+
+def normalize_queries(apps, schema_editor):
+    """
+    Historic SearchQuery rows get the normalized keywords and their fingerprint, one UPDATE per
+    (keywords, fingerprint) and chunk.
+    """
+    SearchQuery = apps.get_model("statistics", "SearchQuery")
+    pending = {}  # (keywords, fingerprint) -> query pks
+
+    def flush():
+        for (keywords, fingerprint), pks in pending.items():
+            SearchQuery.objects.filter(pk__in=pks).update(keywords=keywords, fingerprint=fingerprint)
+        pending.clear()
+
+    queries = SearchQuery.objects.values_list("pk", "keywords", "param_set__params").order_by("pk")
+    for count, (pk, keywords, params) in enumerate(queries.iterator(chunk_size=CHUNK_SIZE), 1):
+        normalized = normalize_keywords(keywords)[:255]
+        pending.setdefault((normalized, query_fingerprint(normalized, normalize_params(params))), []).append(pk)
+        if count % CHUNK_SIZE == 0:
+            flush()
+    flush()
+
+
+def merge_keyword_rollups(apps, schema_editor):
+    """
+    SearchKeywordRollup rows of a bucket with the same normalized keywords are merged into one
+    (the row already holding the normalized keywords, else the oldest one); read bucket by bucket.
+    """
+    SearchKeywordRollup = apps.get_model("statistics", "SearchKeywordRollup")
+    bucket_rows, current = [], None
+
+    def flush():
+        groups = {}
+        for row in bucket_rows:
+            groups.setdefault(normalize_keywords(row[1])[:255], []).append(row)
+        obsolete, survivors = [], []
+        for normalized, group in groups.items():
+            group.sort(key=lambda row: (row[1] != normalized, row[0]))
+            pk, keywords, count = group[0]
+            obsolete.extend(row[0] for row in group[1:])
+            total = sum(row[2] for row in group)
+            if keywords != normalized or total != count:
+                survivors.append(SearchKeywordRollup(pk=pk, keywords=normalized, count=total))
+        if obsolete:
+            SearchKeywordRollup.objects.filter(pk__in=obsolete).delete()
+        SearchKeywordRollup.objects.bulk_update(survivors, ["keywords", "count"], batch_size=500)
+        bucket_rows.clear()
+
+    rows = SearchKeywordRollup.objects.values_list("period", "bucket", "pk", "keywords", "count") \
+        .order_by("period", "bucket", "pk")
+    for period, bucket, pk, keywords, count in rows.iterator(chunk_size=CHUNK_SIZE):
+        if (period, bucket) != current:
+            flush()
+            current = (period, bucket)
+        bucket_rows.append((pk, keywords, count))
+    flush()
+
+
+def merge_keyword_stats(apps, schema_editor):
+    """
+    SearchQueryStats rows of the same normalized keywords ("Berlin", "berlin ") are merged into the oldest one,
+    which keeps its created_at; the other rows (and keywords of stop words only) are deleted.
+    """
+    SearchQueryStats = apps.get_model("statistics", "SearchQueryStats")
+    groups = {}
+    rows = SearchQueryStats.objects.values_list("pk", "keywords", "count", "updated_at").order_by("created_at", "pk")
+    for pk, keywords, count, updated_at in rows.iterator(chunk_size=2000):
+        groups.setdefault(normalize_keywords(keywords)[:255], []).append((pk, keywords, count, updated_at))
+    obsolete, survivors = [pk for pk, *_ in groups.pop("", [])], []
+    for normalized, group in groups.items():
+        pk, keywords, count, updated_at = group[0]
+        obsolete.extend(row[0] for row in group[1:])
+        total = sum(row[2] for row in group)
+        if keywords != normalized or total != count:
+            survivors.append(SearchQueryStats(pk=pk, keywords=normalized, count=total,
+                                              updated_at=max(row[3] for row in group)))
+    # duplicates first: a survivor may take over the keywords of a deleted row
+    for start in range(0, len(obsolete), 1000):
+        SearchQueryStats.objects.filter(pk__in=obsolete[start:start + 1000]).delete()
+    SearchQueryStats.objects.bulk_update(survivors, ["keywords", "count", "updated_at"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statistics', '0010_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchquery',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, max_length=40, verbose_name='Fingerprint'),
+        ),
+        migrations.RunPython(merge_keyword_stats, migrations.RunPython.noop),
+        migrations.RunPython(normalize_queries, migrations.RunPython.noop),
+        migrations.RunPython(merge_keyword_rollups, migrations.RunPython.noop),
+    ]
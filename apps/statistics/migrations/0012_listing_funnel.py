@@ -0,0 +1,96 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:28
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+
+COUNTERS = ("views", "unique_viewers", "bookings_created", "bookings_approved", "bookings_completed", "reviews")
+
+
+def fill_funnel(apps, schema_editor):
+    """
+    Funnel of the existing history: views from the daily rollups (days before the first raw view) + raw views,
+    unique viewers counted from the raw views (days purged before have only their daily sketches, if any),
+    bookings/reviews by their creation day. Status changes have no history: approved/completed bookings
+    are counted on the day of their last update.
+    """
+    ListingView = apps.get_model("statistics", "ListingView")
+    ListingViewDaily = apps.get_model("statistics", "ListingViewDaily")
+    ListingFunnelDaily = apps.get_model("statistics", "ListingFunnelDaily")
+    Booking = apps.get_model("bookings", "Booking")
+    Review = apps.get_model("reviews", "Review")
+    funnel = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+    first_day = (ListingView.objects.annotate(day=TruncDate("created_at")).order_by("created_at")
+                 .values_list("day", flat=True).first())
+    rollups = ListingViewDaily.objects.all()
+    if first_day is not None:
+        rollups = rollups.filter(day__lt=first_day)
+    for listing_id, day, views in rollups.values_list("listing_id", "day", "views"):
+        funnel[listing_id, day]["views"] += views
+    for listing_id, day, unique_viewers in (ListingViewDaily.objects.filter(unique_visitors__gt=0)
+                                            .values_list("listing_id", "day", "unique_visitors")):
+        funnel[listing_id, day]["unique_viewers"] = unique_viewers
+    # retained days: exact distinct visitors (user, else the visitor cookie as in the view buffer)
+    raw = (ListingView.objects.annotate(day=TruncDate("created_at"))
+           .values_list("listing_id", "day")
+           .annotate(total=Count("id"),
+                     users=Count("user_id", distinct=True),
+                     anonymous=Count("session_id", distinct=True, filter=Q(user__isnull=True) & ~Q(session_id="")))
+           .order_by())
+    for listing_id, day, views, users, anonymous in raw:
+        funnel[listing_id, day]["views"] += views
+        funnel[listing_id, day]["unique_viewers"] = users + anonymous
+
+    for field, counter, condition in (("created_at", "bookings_created", Q()),
+                                      ("updated_at", "bookings_approved", Q(status__in=["approved", "completed"])),
+                                      ("updated_at", "bookings_completed", Q(status="completed"))):
+        rows = (Booking.objects.filter(condition).annotate(day=TruncDate(field))
+                .values_list("listing_id", "day").annotate(total=Count("id")).order_by())
+        for listing_id, day, total in rows:
+            funnel[listing_id, day][counter] += total
+    rows = (Review.objects.annotate(day=TruncDate("created_at"))
+            .values_list("listing_id", "day").annotate(total=Count("id")).order_by())
+    for listing_id, day, total in rows:
+        funnel[listing_id, day]["reviews"] += total
+
+    ListingFunnelDaily.objects.bulk_create(
+        [ListingFunnelDaily(listing_id=listing_id, day=day, **counters)
+         for (listing_id, day), counters in funnel.items()], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0003_search_index'),
+        ('statistics', '0011_query_fingerprint'),
+        ('bookings', '0014_booked_night'),
+        ('reviews', '0006_alter_review_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingFunnelDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Views')),
+                ('unique_viewers', models.PositiveIntegerField(default=0, verbose_name='Unique viewers (estimate)')),
+                ('bookings_created', models.PositiveIntegerField(default=0, verbose_name='Bookings created')),
+                ('bookings_approved', models.PositiveIntegerField(default=0, verbose_name='Bookings approved')),
+                ('bookings_completed', models.PositiveIntegerField(default=0, verbose_name='Bookings completed')),
+                ('reviews', models.PositiveIntegerField(default=0, verbose_name='Reviews')),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='funnel_daily', to='listings.listing', verbose_name='Listing')),
+            ],
+            options={
+                'verbose_name': 'Listing funnel per day',
+                'verbose_name_plural': 'Listing funnel per day',
+                'indexes': [models.Index(fields=['day'], name='stats_funnel_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('listing', 'day'), name='uniq_funnel_listing_day')],
+            },
+        ),
+        migrations.RunPython(fill_funnel, migrations.RunPython.noop),
+    ]
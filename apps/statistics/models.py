@@ -1,8 +1,19 @@
+import hashlib
+import json
+import math
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal, ROUND_HALF_UP
+
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
+from ..core.db import upsert_increment
 from ..core.models import TimeStampedModel
+from .hll import HyperLogLog
+
+TRENDING_EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)  # fixed origin of the trending scores
 
 class ListingView(TimeStampedModel):
     listing = models.ForeignKey(
@@ -23,11 +34,235 @@ class ListingView(TimeStampedModel):
     class Meta:
         verbose_name = "Listing view"
         verbose_name_plural = "Listing views"
+        indexes = [models.Index(fields=["created_at"], name="stats_view_created_idx")]  # rollups/retention
+
+
+class ListingViewDaily(models.Model):
+    """
+    Daily rollup of ListingView (manage.py rollup_views); raw views are kept only LISTING_VIEW_RETENTION_DAYS.
+    """
+    listing = models.ForeignKey(
+        "listings.Listing",
+        on_delete=models.CASCADE,
+        related_name="views_daily",
+        verbose_name=_("Listing")
+    )
+    day = models.DateField(verbose_name=_("Day"))
+    views = models.PositiveIntegerField(default=0, verbose_name=_("Views"))
+    unique_sessions = models.PositiveIntegerField(default=0, verbose_name=_("Unique sessions"))
+    unique_users = models.PositiveIntegerField(default=0, verbose_name=_("Unique users"))
+    # HyperLogLog of the visitors (user or visitor cookie), merged on every flush of the view buffer
+    visitors_sketch = models.BinaryField(default=b"", editable=False, verbose_name=_("Visitors sketch"))
+    unique_visitors = models.PositiveIntegerField(default=0, verbose_name=_("Unique visitors (estimate)"))
+
+    class Meta:
+        verbose_name = "Listing views per day"
+        verbose_name_plural = "Listing views per day"
+        constraints = [models.UniqueConstraint(fields=["listing", "day"], name="uniq_view_daily_listing_day")]
+        indexes = [models.Index(fields=["day"], name="stats_view_daily_day_idx")]
+
+    @classmethod
+    def add_visitors(cls, day, visitors: dict[int, set[str]]) -> dict[int, int]:
+        """
+        Merges the visitors of many listings into their sketches of the day (locked rows).
+
+        :param visitors: {listing_id: {visitor key}}
+        :return: {listing_id: estimated unique visitors of the day}
+        """
+        if not visitors:
+            return {}
+        with transaction.atomic():
+            cls.objects.bulk_create([cls(listing_id=listing_id, day=day) for listing_id in visitors],
+                                    ignore_conflicts=True)
+            rows = list(cls.objects.select_for_update().filter(listing_id__in=visitors, day=day))
+            for row in rows:
+                sketch = HyperLogLog(bytes(row.visitors_sketch))
+                for visitor in visitors[row.listing_id]:
+                    sketch.add(visitor)
+                row.visitors_sketch = sketch.to_bytes()
+                row.unique_visitors = sketch.count()
+            cls.objects.bulk_update(rows, ["visitors_sketch", "unique_visitors"])
+        return {row.listing_id: row.unique_visitors for row in rows}
+
+    @classmethod
+    def estimate_visitors(cls, listing_id: int, date_from, date_to) -> int:
+        """
+        Estimated unique visitors of a listing over a range of days (union of the daily sketches).
+        """
+        return cls.estimate_visitors_many([listing_id], date_from, date_to)[listing_id]
+
+    @classmethod
+    def estimate_visitors_many(cls, listing_ids, date_from=None, date_to=None) -> dict[int, int]:
+        """
+        Estimated unique visitors per listing over a range of days (open bounds allowed);
+        a visitor of several days is counted once.
+        """
+        queryset = cls.objects.filter(listing_id__in=listing_ids)
+        if date_from:
+            queryset = queryset.filter(day__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(day__lte=date_to)
+        unions = {listing_id: HyperLogLog() for listing_id in listing_ids}
+        for listing_id, registers in queryset.values_list("listing_id", "visitors_sketch").iterator():
+            if registers:
+                unions[listing_id].merge(HyperLogLog(bytes(registers)))
+        return {listing_id: sketch.count() for listing_id, sketch in unions.items()}
+
+
+class ListingFunnelDaily(models.Model):
+    """
+    View-to-booking funnel of a listing per day, maintained incrementally:
+    views/unique_viewers by the view buffer (unique_viewers - HyperLogLog estimate of the day),
+    bookings/reviews by the booking and review signals (day of the event).
+    """
+    COUNTERS = ("views", "bookings_created", "bookings_approved", "bookings_completed", "reviews")
+
+    listing = models.ForeignKey(
+        "listings.Listing",
+        on_delete=models.CASCADE,
+        related_name="funnel_daily",
+        verbose_name=_("Listing")
+    )
+    day = models.DateField(verbose_name=_("Day"))
+    views = models.PositiveIntegerField(default=0, verbose_name=_("Views"))
+    unique_viewers = models.PositiveIntegerField(default=0, verbose_name=_("Unique viewers (estimate)"))
+    bookings_created = models.PositiveIntegerField(default=0, verbose_name=_("Bookings created"))
+    bookings_approved = models.PositiveIntegerField(default=0, verbose_name=_("Bookings approved"))
+    bookings_completed = models.PositiveIntegerField(default=0, verbose_name=_("Bookings completed"))
+    reviews = models.PositiveIntegerField(default=0, verbose_name=_("Reviews"))
+
+    class Meta:
+        verbose_name = "Listing funnel per day"
+        verbose_name_plural = "Listing funnel per day"
+        constraints = [models.UniqueConstraint(fields=["listing", "day"], name="uniq_funnel_listing_day")]
+        indexes = [models.Index(fields=["day"], name="stats_funnel_day_idx")]
+
+    @classmethod
+    def add_events(cls, day, counts: dict[int, dict[str, int]]) -> None:
+        """
+        counter += n for many listings of a day in one upsert.
+
+        :param counts: {listing_id: {counter: n}}
+        """
+        upsert_increment(
+            cls,
+            [{"listing_id": listing_id, "day": day, **dict.fromkeys(cls.COUNTERS, 0), **events}
+             for listing_id, events in counts.items()],
+            conflict_fields=["listing", "day"],
+            increments=list(cls.COUNTERS),
+        )
+
+    @classmethod
+    def set_unique_viewers(cls, day, unique_viewers: dict[int, int]) -> None:
+        upsert_increment(
+            cls,
+            [{"listing_id": listing_id, "day": day, "unique_viewers": count}
+             for listing_id, count in unique_viewers.items()],
+            conflict_fields=["listing", "day"],
+            increments=[],
+            updates=["unique_viewers"],
+        )
+
+
+class RollupWatermark(models.Model):
+    """
+    Last raw row (id) processed by a rollup job.
+    """
+    name = models.CharField(max_length=50, primary_key=True, verbose_name=_("Name"))
+    position = models.BigIntegerField(default=0, verbose_name=_("Position"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated at"))
+
+    class Meta:
+        verbose_name = "Rollup watermark"
+        verbose_name_plural = "Rollup watermarks"
+
+    @classmethod
+    def get(cls, name: str) -> int:
+        return cls.objects.filter(name=name).values_list("position", flat=True).first() or 0
+
+    @classmethod
+    def set(cls, name: str, position: int) -> None:
+        cls.objects.update_or_create(name=name, defaults={"position": position})
+
+
+def normalize_param_value(value) -> str:
+    return str(value).strip().lower()[:100]
+
+
+class SearchParamSet(models.Model):
+    """
+    Distinct set of search params, stored once (sha256 of the canonical JSON) and referenced by SearchQuery.
+    Its key/values are decomposed into SearchParamItem for indexed filtering.
+    """
+    hash = models.CharField(max_length=64, unique=True, verbose_name=_("Hash"))
+    params = models.JSONField(default=dict, verbose_name=_("Params"))
+
+    class Meta:
+        verbose_name = "Search param set"
+        verbose_name_plural = "Search param sets"
+
+    @staticmethod
+    def param_hash(params: dict) -> str:
+        canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    @staticmethod
+    def pairs(params: dict) -> set[tuple[str, str]]:
+        """
+        (key, value_norm) of the params, a list value (query string) gives one pair per item.
+        """
+        pairs = set()
+        for key, values in (params or {}).items():
+            for value in values if isinstance(values, list) else [values]:
+                pairs.add((str(key)[:50], normalize_param_value(value)))
+        return pairs
+
+    @classmethod
+    def ids_for(cls, param_sets: list[dict]) -> list[int | None]:
+        """
+        Ids of the param sets (None for empty params), the missing ones with their items are created.
+        """
+        hashes = [cls.param_hash(params) if params else None for params in param_sets]
+        by_hash = {hash_: params for hash_, params in zip(hashes, param_sets) if hash_}
+        ids = dict(cls.objects.filter(hash__in=by_hash).values_list("hash", "id"))
+        missing = {hash_: params for hash_, params in by_hash.items() if hash_ not in ids}
+        if missing:
+            with transaction.atomic():
+                cls.objects.bulk_create([cls(hash=hash_, params=params) for hash_, params in missing.items()],
+                                        ignore_conflicts=True)
+                created = dict(cls.objects.filter(hash__in=missing).values_list("hash", "id"))
+                SearchParamItem.objects.bulk_create(
+                    [SearchParamItem(param_set_id=created[hash_], key=key, value_norm=value)
+                     for hash_, params in missing.items() for key, value in cls.pairs(params)],
+                    ignore_conflicts=True, batch_size=1000)
+            ids.update(created)
+        return [ids[hash_] if hash_ else None for hash_ in hashes]
+
+
+class SearchParamItem(models.Model):
+    """
+    One key/value (normalized) of a SearchParamSet.
+    """
+    param_set = models.ForeignKey(
+        SearchParamSet,
+        on_delete=models.CASCADE,
+        related_name="items",
+        verbose_name=_("Param set")
+    )
+    key = models.CharField(max_length=50, verbose_name=_("Key"))
+    value_norm = models.CharField(max_length=100, verbose_name=_("Value (normalized)"))
+
+    class Meta:
+        verbose_name = "Search param item"
+        verbose_name_plural = "Search param items"
+        constraints = [models.UniqueConstraint(fields=["param_set", "key", "value_norm"],
+                                               name="uniq_search_param_item")]
+        indexes = [models.Index(fields=["key", "value_norm", "param_set"], name="search_param_kv_idx")]
 
 
 class SearchQuery(TimeStampedModel):
     """
-    Search query keywords + params.
+    Search query keywords + params (deduplicated SearchParamSet).
     """
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -38,12 +273,63 @@ class SearchQuery(TimeStampedModel):
     )
     session_id = models.CharField(max_length=64, blank=True, verbose_name=_("Session ID"))
     keywords = models.CharField(max_length=255, verbose_name=_("Keywords"))
-    params = models.JSONField(default=dict, blank=True, verbose_name=_("Params"))
+    # sha1 of the normalized keywords + params (apps.core.text.query_fingerprint)
+    fingerprint = models.CharField(max_length=40, blank=True, db_index=True, verbose_name=_("Fingerprint"))
+    param_set = models.ForeignKey(
+        SearchParamSet,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="queries",
+        verbose_name=_("Params")
+    )
 
     class Meta:
         verbose_name = "Search query"
         verbose_name_plural = "Search queries"
 
+    @property
+    def params(self) -> dict:
+        return self.param_set.params if self.param_set_id else {}
+
+
+class SearchRollupPeriod(models.TextChoices):
+    HOUR = "hour", _("Hour")
+    DAY = "day", _("Day")
+
+
+class SearchKeywordRollup(models.Model):
+    """
+    Number of searches per keywords and hour/day bucket (maintained on every flush of the search buffer).
+    """
+    period = models.CharField(max_length=4, choices=SearchRollupPeriod.choices, verbose_name=_("Period"))
+    bucket = models.DateTimeField(verbose_name=_("Bucket start"))
+    keywords = models.CharField(max_length=255, verbose_name=_("Keywords"))
+    count = models.PositiveIntegerField(default=0, verbose_name=_("Count"))
+
+    class Meta:
+        verbose_name = "Search keywords rollup"
+        verbose_name_plural = "Search keywords rollups"
+        constraints = [models.UniqueConstraint(fields=["period", "bucket", "keywords"],
+                                               name="uniq_search_kw_rollup")]
+
+
+class SearchParamRollup(models.Model):
+    """
+    Number of searches per param key/value and hour/day bucket (maintained on every flush of the search buffer).
+    """
+    period = models.CharField(max_length=4, choices=SearchRollupPeriod.choices, verbose_name=_("Period"))
+    bucket = models.DateTimeField(verbose_name=_("Bucket start"))
+    key = models.CharField(max_length=50, verbose_name=_("Key"))
+    value = models.CharField(max_length=100, verbose_name=_("Value"))
+    count = models.PositiveIntegerField(default=0, verbose_name=_("Count"))
+
+    class Meta:
+        verbose_name = "Search params rollup"
+        verbose_name_plural = "Search params rollups"
+        constraints = [models.UniqueConstraint(fields=["period", "bucket", "key", "value"],
+                                               name="uniq_search_param_rollup")]
+
 
 class SearchQueryStats(TimeStampedModel):
     """
@@ -56,6 +342,19 @@ class SearchQueryStats(TimeStampedModel):
         verbose_name = "Search keywords stats"
         verbose_name_plural = "Search keywords stats"
 
+    @classmethod
+    def add_counts(cls, counts: dict[str, int]) -> None:
+        """
+        count += n for many keywords in one upsert.
+        """
+        upsert_increment(
+            cls,
+            [{"keywords": keywords, "count": count} for keywords, count in counts.items()],
+            conflict_fields=["keywords"],
+            increments=["count"],
+            updates=["updated_at"],
+        )
+
 
 class ListingStats(TimeStampedModel):
     """
@@ -63,9 +362,18 @@ class ListingStats(TimeStampedModel):
 
     - views_count: total number of views
     - reviews_count: number of reviews
-    - avg_rating: average rating
-    - popularity: views, reviews, rating
+    - rating_sum/rating_count: running sum/number of the ratings of valid reviews (no aggregates over Review)
+    - rating_1..rating_5: number of valid reviews per star (histogram)
+    - avg_rating: average rating (rating_sum / rating_count)
+    - popularity: views_count * 2 + reviews_count * 4 (materialized, kept in sync on every counter change)
+    - rating_score: Bayesian average rating (pulled to RATING_PRIOR_MEAN while there are few reviews)
+    - is_active: copy of Listing.is_active, so that ranking sorts are an index range scan
+    - trending: views and bookings decayed with TRENDING_HALF_LIFE_HOURS, in log2 space (add_trending)
     """
+    VIEW_WEIGHT = 2
+    REVIEW_WEIGHT = 4
+    RATINGS = (1, 2, 3, 4, 5)
+
     listing = models.OneToOneField(
         "listings.Listing",
         on_delete=models.CASCADE,
@@ -75,8 +383,135 @@ class ListingStats(TimeStampedModel):
     )
     views_count = models.PositiveIntegerField(default=0, verbose_name=_("Views count"))
     reviews_count = models.PositiveIntegerField(default=0, verbose_name=_("Reviews count"))
+    rating_sum = models.PositiveIntegerField(default=0, verbose_name=_("Rating sum"))
+    rating_count = models.PositiveIntegerField(default=0, verbose_name=_("Rating count"))
+    rating_1 = models.PositiveIntegerField(default=0, verbose_name=_("1 star reviews"))
+    rating_2 = models.PositiveIntegerField(default=0, verbose_name=_("2 star reviews"))
+    rating_3 = models.PositiveIntegerField(default=0, verbose_name=_("3 star reviews"))
+    rating_4 = models.PositiveIntegerField(default=0, verbose_name=_("4 star reviews"))
+    rating_5 = models.PositiveIntegerField(default=0, verbose_name=_("5 star reviews"))
     avg_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0, verbose_name=_("Avg rating"))
+    popularity = models.PositiveIntegerField(default=0, verbose_name=_("Popularity"))
+    rating_score = models.DecimalField(max_digits=3, decimal_places=2, default=0, verbose_name=_("Rating score"))
+    is_active = models.BooleanField(default=True, verbose_name=_("Is active"))
+    trending = models.FloatField(null=True, blank=True, verbose_name=_("Trending score (log2)"))
 
     class Meta:
         verbose_name = "Listing stats"
         verbose_name_plural = "Listing stats"
+        indexes = [
+            models.Index(fields=["is_active", "popularity", "rating_score"], name="stats_active_popularity_idx"),
+            models.Index(fields=["is_active", "rating_score"], name="stats_active_rating_idx"),
+            models.Index(fields=["is_active", "trending"], name="stats_active_trending_idx"),
+        ]
+
+    @classmethod
+    def add_views(cls, counts: dict[int, int], active: dict[int, bool]) -> None:
+        """
+        views_count/popularity += n for many listings in one upsert.
+
+        :param counts: {listing_id: number of views}
+        :param active: {listing_id: Listing.is_active} - for the rows that don't exist yet
+        """
+        upsert_increment(
+            cls,
+            [{"listing_id": listing_id, "views_count": count, "popularity": count * cls.VIEW_WEIGHT,
+              "is_active": active.get(listing_id, True)} for listing_id, count in counts.items()],
+            conflict_fields=["listing"],
+            increments=["views_count", "popularity"],
+            updates=["updated_at"],
+        )
+
+    @staticmethod
+    def trending_log(weight: float, moment) -> float:
+        """
+        log2(weight * 2 ** (hours since TRENDING_EPOCH / half-life)) - an event in the log space.
+        """
+        hours = (moment - TRENDING_EPOCH).total_seconds() / 3600
+        return math.log2(weight) + hours / settings.TRENDING_HALF_LIFE_HOURS
+
+    @classmethod
+    def add_trending(cls, weights: dict[int, float], active: dict[int, bool], moment=None) -> None:
+        """
+        Adds events to the decayed trending score of many listings (locked rows, no recompute).
+
+        trending = log2(sum of weight * 2 ** ((t - epoch) / half-life)); the common decay factor of "now"
+        doesn't change the order, so the stored value is sorted as is and never has to be decayed.
+
+        :param weights: {listing_id: weight of the events}
+        :param active: {listing_id: Listing.is_active} - for the rows that don't exist yet
+        """
+        weights = {listing_id: weight for listing_id, weight in weights.items() if weight > 0}
+        if not weights:
+            return
+        moment = moment or timezone.now()
+        with transaction.atomic():
+            cls.objects.bulk_create([cls(listing_id=listing_id, is_active=active.get(listing_id, True))
+                                     for listing_id in weights], ignore_conflicts=True)
+            rows = list(cls.objects.select_for_update().filter(pk__in=weights))
+            for stats in rows:
+                event = cls.trending_log(weights[stats.pk], moment)
+                if stats.trending is None:
+                    stats.trending = event
+                else:  # log2(2 ** a + 2 ** b) without overflow
+                    high, low = max(stats.trending, event), min(stats.trending, event)
+                    stats.trending = high + math.log2(1 + 2 ** (low - high))
+            cls.objects.bulk_update(rows, ["trending"])
+
+    @staticmethod
+    def bayesian_rating(avg_rating, count: int) -> Decimal:
+        """
+        (C * m + avg * n) / (C + n), C = RATING_PRIOR_COUNT, m = RATING_PRIOR_MEAN.
+        """
+        prior_count = Decimal(settings.RATING_PRIOR_COUNT)
+        prior_mean = Decimal(str(settings.RATING_PRIOR_MEAN))
+        score = (prior_count * prior_mean + Decimal(avg_rating or 0) * count) / ((prior_count + count) or 1)
+        return score.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+    @classmethod
+    def apply_review_delta(cls, listing_id: int, reviews: int = 0, old_rating: int | None = None,
+                           new_rating: int | None = None) -> None:
+        """
+        Applies the change of one review to the running counters (locked row, O(1) in the number of reviews).
+
+        :param reviews: +1 created / -1 deleted review
+        :param old_rating: rating the review counted with before (None - not counted: new/invalid/without rating)
+        :param new_rating: rating the review counts with now (None - not counted)
+        """
+        if not reviews and old_rating == new_rating:
+            return
+        with transaction.atomic():
+            queryset = cls.objects.select_for_update()
+            if reviews < 0:  # deleted review: the stats row may be deleted together with the listing
+                stats = queryset.filter(listing_id=listing_id).first()
+                if stats is None:
+                    return
+            else:
+                stats, _ = queryset.get_or_create(listing_id=listing_id)
+            stats.reviews_count = max(stats.reviews_count + reviews, 0)
+            for rating, sign in ((old_rating, -1), (new_rating, 1)):
+                if rating in cls.RATINGS:
+                    stats.rating_sum = max(stats.rating_sum + sign * rating, 0)
+                    stats.rating_count = max(stats.rating_count + sign, 0)
+                    field = f"rating_{rating}"
+                    setattr(stats, field, max(getattr(stats, field) + sign, 0))
+            stats.refresh_rating()
+            stats.refresh_popularity()
+            stats.save(update_fields=["reviews_count", "rating_sum", "rating_count",
+                                      *[f"rating_{rating}" for rating in cls.RATINGS],
+                                      "avg_rating", "rating_score", "popularity", "updated_at"])
+
+    @property
+    def rating_histogram(self) -> dict[str, int]:
+        return {str(rating): getattr(self, f"rating_{rating}") for rating in self.RATINGS}
+
+    def refresh_rating(self) -> None:
+        if self.rating_count:
+            avg_rating = Decimal(self.rating_sum) / self.rating_count
+            self.avg_rating = avg_rating.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        else:
+            avg_rating = self.avg_rating = Decimal(0)
+        self.rating_score = self.bayesian_rating(avg_rating, self.rating_count)
+
+    def refresh_popularity(self) -> None:
+        self.popularity = self.views_count * self.VIEW_WEIGHT + self.reviews_count * self.REVIEW_WEIGHT
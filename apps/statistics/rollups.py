@@ -0,0 +1,223 @@
+"""
+Rollups of the raw statistics tables.
+
+Views (manage.py rollup_views): only raw rows after the watermark (last processed id) and the rows of the last
+LISTING_VIEW_ROLLUP_LAG_MINUTES are read to find the touched days - a transaction committed late gets ids below
+an already visible higher id. A touched day is re-aggregated as a whole, so the distinct counts stay exact and
+rerunning is harmless. Raw rows older than the retention are deleted only if they are already rolled up.
+
+Searches: hourly and daily counters of keywords and param key/values are incremented on every flush
+of the search buffer; a date range is summed from whole days, whole hours and raw rows of the partial edges.
+"""
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from ..core.db import upsert_increment
+from .models import ListingView, ListingViewDaily, RollupWatermark, SearchQuery, SearchKeywordRollup, \
+    SearchParamRollup, SearchRollupPeriod, SearchParamSet
+
+VIEWS_WATERMARK = "listing_views"
+
+
+def day_start(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def rollup_day(day: date) -> int:
+    """
+    (Re)aggregates the views of one day. Returns the number of rollup rows.
+    """
+    rows = (ListingView.objects
+            .filter(created_at__gte=day_start(day), created_at__lt=day_start(day + timedelta(days=1)))
+            .values("listing_id")
+            .annotate(views=Count("id"),
+                      unique_sessions=Count("session_id", distinct=True, filter=~Q(session_id="")),
+                      unique_users=Count("user_id", distinct=True))
+            .order_by())
+    rows = [dict(row, day=day) for row in rows]
+    upsert_increment(ListingViewDaily, rows, conflict_fields=["listing", "day"], increments=[],
+                     updates=["views", "unique_sessions", "unique_users"])
+    return len(rows)
+
+
+def rollup_views() -> dict:
+    """
+    Rolls up the days touched by the views after the watermark or within the lag window.
+    """
+    last_id = RollupWatermark.get(VIEWS_WATERMARK)
+    max_id = ListingView.objects.order_by("-pk").values_list("pk", flat=True).first()
+    if max_id is None:
+        return {"days": 0, "rows": 0}
+    lag_start = timezone.now() - timedelta(minutes=settings.LISTING_VIEW_ROLLUP_LAG_MINUTES)
+    new_views = ListingView.objects.filter(Q(pk__gt=last_id) | Q(created_at__gte=lag_start), pk__lte=max_id)
+    days = sorted(new_views.annotate(day=TruncDate("created_at")).values_list("day", flat=True).distinct().order_by())
+    rows = sum(rollup_day(day) for day in days)
+    RollupWatermark.set(VIEWS_WATERMARK, max_id)
+    return {"days": len(days), "rows": rows}
+
+
+def purge_views(retention_days: int, chunk_size: int = 10000) -> int:
+    """
+    Deletes rolled up raw views of the days older than retention_days, chunk by chunk.
+    """
+    boundary = day_start(timezone.localdate() - timedelta(days=retention_days))
+    last_id = RollupWatermark.get(VIEWS_WATERMARK)
+    deleted = 0
+    while True:
+        ids = list(ListingView.objects.filter(created_at__lt=boundary, pk__lte=last_id)
+                   .order_by("pk").values_list("pk", flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        deleted += ListingView.objects.filter(pk__in=ids).delete()[0]
+
+
+def views_by_listing(listing_ids: list[int]) -> dict[int, int]:
+    """
+    Total views per listing: rollups for the purged days + raw views for the retained ones.
+    """
+    first_view = ListingView.objects.order_by("created_at").values_list("created_at", flat=True).first()
+    totals = dict.fromkeys(listing_ids, 0)
+    rollups = ListingViewDaily.objects.filter(listing_id__in=listing_ids)
+    raw = ListingView.objects.filter(listing_id__in=listing_ids)
+    if first_view is not None:
+        first_day = timezone.localdate(first_view)
+        rollups = rollups.filter(day__lt=first_day)
+        raw = raw.filter(created_at__gte=day_start(first_day))
+        for listing_id, count in raw.values_list("listing_id").annotate(count=Count("id")).order_by():
+            totals[listing_id] += count
+    for listing_id, count in rollups.values_list("listing_id").annotate(count=Sum("views")).order_by():
+        totals[listing_id] += count
+    return totals
+
+
+def hour_floor(moment: datetime) -> datetime:
+    return timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+
+
+def day_floor(moment: datetime) -> datetime:
+    return day_start(timezone.localdate(moment))
+
+
+def ceil_to(moment: datetime, floor, step: timedelta) -> datetime:
+    start = floor(moment)
+    return start if start == moment else floor(start + step)
+
+
+def add_search_rollups(searches) -> None:
+    """
+    Increments the hourly/daily rollups by the saved searches (two upserts).
+
+    :param searches: [(created_at, keywords, params)]
+    """
+    keywords, params = Counter(), Counter()
+    for created_at, query_keywords, query_params in searches:
+        pairs = SearchParamSet.pairs(query_params)
+        for period, bucket in ((SearchRollupPeriod.HOUR, hour_floor(created_at)),
+                               (SearchRollupPeriod.DAY, day_floor(created_at))):
+            keywords[period, bucket, query_keywords] += 1
+            for key, value in pairs:
+                params[period, bucket, key, value] += 1
+    upsert_increment(SearchKeywordRollup,
+                     [{"period": period, "bucket": bucket, "keywords": kw, "count": count}
+                      for (period, bucket, kw), count in keywords.items()],
+                     conflict_fields=["period", "bucket", "keywords"], increments=["count"])
+    upsert_increment(SearchParamRollup,
+                     [{"period": period, "bucket": bucket, "key": key, "value": value, "count": count}
+                      for (period, bucket, key, value), count in params.items()],
+                     conflict_fields=["period", "bucket", "key", "value"], increments=["count"])
+
+
+def split_range(date_from: datetime | None, date_to: datetime | None):
+    """
+    Splits [date_from, date_to] into whole days, whole hours and the partial edges (half-open ranges,
+    None - unbounded).
+
+    :return: (days, hours, raw) - lists of (start, end)
+    """
+    end = date_to + timedelta(microseconds=1) if date_to else None
+    if date_from and end and date_from >= end:
+        return [], [], []
+    first_hour = ceil_to(date_from, hour_floor, timedelta(hours=1)) if date_from else None
+    end_hour = hour_floor(end) if end else None
+    if first_hour and end_hour and first_hour >= end_hour:
+        return [], [], [(date_from, end)]
+    raw = []
+    if date_from and date_from < first_hour:
+        raw.append((date_from, first_hour))
+    if end and end_hour < end:
+        raw.append((end_hour, end))
+    first_day = ceil_to(first_hour, day_floor, timedelta(days=1)) if first_hour else None
+    end_day = day_floor(end_hour) if end_hour else None
+    if first_day and end_day and first_day >= end_day:
+        return [], [(first_hour, end_hour)], raw
+    hours = []
+    if first_hour and first_hour < first_day:
+        hours.append((first_hour, first_day))
+    if end_hour and end_day < end_hour:
+        hours.append((end_day, end_hour))
+    return [(first_day, end_day)], hours, raw
+
+
+def in_range(field: str, start: datetime | None, end: datetime | None) -> Q:
+    condition = Q()
+    if start:
+        condition &= Q(**{f"{field}__gte": start})
+    if end:
+        condition &= Q(**{f"{field}__lt": end})
+    return condition
+
+
+def rollup_ranges(date_from, date_to):
+    """
+    [(period, start, end)] of the rollups + [(start, end)] of the raw edges.
+    """
+    days, hours, raw = split_range(date_from, date_to)
+    return ([(SearchRollupPeriod.DAY, *bounds) for bounds in days]
+            + [(SearchRollupPeriod.HOUR, *bounds) for bounds in hours]), raw
+
+
+def summarize_keywords(date_from=None, date_to=None, keyword: str = "") -> list[dict]:
+    """
+    [{keywords, count}] of the searches in the range ordered by count desc (as Count over SearchQuery).
+    """
+    rollups, raw = rollup_ranges(date_from, date_to)
+    counts = Counter()
+    for period, start, end in rollups:
+        queryset = SearchKeywordRollup.objects.filter(in_range("bucket", start, end), period=period)
+        if keyword:
+            queryset = queryset.filter(keywords__icontains=keyword)
+        counts.update(dict(queryset.values_list("keywords").annotate(total=Sum("count")).order_by()))
+    for start, end in raw:
+        queryset = SearchQuery.objects.filter(in_range("created_at", start, end))
+        if keyword:
+            queryset = queryset.filter(keywords__icontains=keyword)
+        counts.update(dict(queryset.values_list("keywords").annotate(total=Count("id")).order_by()))
+    ordered = sorted(counts.items(), key=lambda item: (item[1], item[0]), reverse=True)
+    return [{"keywords": keywords, "count": count} for keywords, count in ordered]
+
+
+def summarize_params(date_from=None, date_to=None, key: str = "") -> list[dict]:
+    """
+    [{key, value, count}] of the search params in the range ordered by count desc.
+    """
+    rollups, raw = rollup_ranges(date_from, date_to)
+    counts = Counter()
+    for period, start, end in rollups:
+        queryset = SearchParamRollup.objects.filter(in_range("bucket", start, end), period=period)
+        if key:
+            queryset = queryset.filter(key=key)
+        for param_key, value, total in (queryset.values_list("key", "value")
+                                        .annotate(total=Sum("count")).order_by()):
+            counts[param_key, value] += total
+    for start, end in raw:
+        queryset = (SearchQuery.objects.filter(in_range("created_at", start, end), param_set__isnull=False)
+                    .values_list("param_set__params", flat=True))
+        for params in queryset:
+            counts.update(pair for pair in SearchParamSet.pairs(params) if not key or pair[0] == key)
+    ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return [{"key": param_key, "value": value, "count": count} for (param_key, value), count in ordered]
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from .models import SearchQueryStats, SearchQuery
+from .models import SearchQueryStats, SearchQuery, ListingViewDaily
 
 class SearchQueryStatsSerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,7 +9,34 @@ class SearchQueryStatsSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 class SearchQuerySerializer(serializers.ModelSerializer):
+    params = serializers.JSONField(read_only=True)
+
     class Meta:
         model = SearchQuery
         fields = ("id", "user", "session_id", "keywords", "params", "created_at")
-        read_only_fields = fields
\ No newline at end of file
+        read_only_fields = fields
+
+class ListingViewDailySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ListingViewDaily
+        fields = ("listing", "day", "views", "unique_sessions", "unique_users", "unique_visitors")
+        read_only_fields = fields
+
+class ListingFunnelSerializer(serializers.Serializer):
+    """
+    Funnel of a listing summed over a date range (unique_viewers - estimate of the union of the daily sketches).
+    """
+    listing = serializers.IntegerField(source="listing_id")
+    title = serializers.CharField(source="listing__title")
+    views = serializers.IntegerField()
+    unique_viewers = serializers.IntegerField()
+    bookings_created = serializers.IntegerField()
+    bookings_approved = serializers.IntegerField()
+    bookings_completed = serializers.IntegerField()
+    reviews = serializers.IntegerField()
+    view_to_booking = serializers.SerializerMethodField()
+
+    def get_view_to_booking(self, row) -> float | None:
+        # None without unique viewer counts (views of days purged before the visitor sketches existed)
+        viewers = row["unique_viewers"]
+        return round(row["bookings_created"] / viewers, 4) if viewers else None
@@ -0,0 +1,81 @@
+"""
+Space-Saving heavy hitters (Metwally et al.): top keywords of a stream in bounded memory.
+
+At most `capacity` items are monitored. A new item replaces the one with the minimal count and inherits
+that count as its error, so every count overestimates by at most total / capacity and every item seen
+more than total / capacity times is monitored. count - error is a guaranteed lower bound.
+"""
+import heapq
+
+
+class SpaceSaving:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.total = 0
+        self._counts = {}  # item -> [count, error]
+        self._heap = []  # (count, item), stale entries are skipped
+        self._published = {}  # item -> count already returned by publish()
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    @property
+    def max_error(self) -> int:
+        """
+        Upper bound of the overestimation (the minimal monitored count once the summary is full).
+        """
+        if len(self._counts) < self.capacity:
+            return 0
+        return self._min()[0]
+
+    def offer(self, item: str, count: int = 1) -> None:
+        self.total += count
+        entry = self._counts.get(item)
+        if entry is not None:
+            entry[0] += count
+        elif len(self._counts) < self.capacity:
+            entry = self._counts[item] = [count, 0]
+            self._published[item] = 0
+        else:
+            min_count, min_item = self._min()
+            del self._counts[min_item]
+            self._published.pop(min_item, None)
+            entry = self._counts[item] = [min_count + count, min_count]
+            # only the guaranteed part of the count is ever published
+            self._published[item] = min_count
+        heapq.heappush(self._heap, (entry[0], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(counted[0], key) for key, counted in self._counts.items()]
+            heapq.heapify(self._heap)
+
+    def top(self, n: int) -> list[tuple[str, int, int]]:
+        """
+        [(item, count, error)] of the n largest counts.
+        """
+        return [(item, entry[0], entry[1])
+                for item, entry in heapq.nlargest(n, self._counts.items(), key=lambda pair: pair[1][0])]
+
+    def publish(self, n: int, min_count: int = 1) -> dict[str, int]:
+        """
+        Increments of the guaranteed counts of the top n items (at least min_count guaranteed hits)
+        since their previous publish - for persistent counters; a fresh replacement with an inherited
+        count doesn't get in.
+        """
+        deltas = {}
+        guaranteed = heapq.nlargest(n, self._counts.items(), key=lambda pair: pair[1][0] - pair[1][1])
+        for item, (count, error) in guaranteed:
+            if count - error < min_count:
+                break
+            delta = count - self._published[item]
+            if delta > 0:
+                deltas[item] = delta
+                self._published[item] = count
+        return deltas
+
+    def _min(self) -> tuple[int, str]:
+        while True:
+            count, item = self._heap[0]
+            entry = self._counts.get(item)
+            if entry is not None and entry[0] == count:
+                return count, item
+            heapq.heappop(self._heap)
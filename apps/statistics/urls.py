@@ -1,9 +1,15 @@
 from rest_framework.routers import DefaultRouter
 
-from .views import PopularSearchesViewSet, PopularListingsViewSet, SearchQueryViewSet
+from .views import PopularSearchesViewSet, PopularListingsViewSet, SearchQueryViewSet, StatsMetricsViewSet, \
+    ListingViewDailyViewSet, TrendingListingsViewSet, TrendingSearchesViewSet, ListingFunnelViewSet
 
 router = DefaultRouter()
 router.register(r"popular/searches", PopularSearchesViewSet, basename="popular-searches")
 router.register(f"popular/listings", PopularListingsViewSet, basename="popular-listings")
+router.register(r"trending/listings", TrendingListingsViewSet, basename="trending-listings")
+router.register(r"trending/searches", TrendingSearchesViewSet, basename="trending-searches")
 router.register(r"searches", SearchQueryViewSet, basename="searches")
+router.register(r"metrics", StatsMetricsViewSet, basename="stats-metrics")
+router.register(r"views/daily", ListingViewDailyViewSet, basename="views-daily")
+router.register(r"funnel", ListingFunnelViewSet, basename="listing-funnel")
 urlpatterns = router.urls
\ No newline at end of file
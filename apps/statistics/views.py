@@ -1,20 +1,24 @@
-from decimal import Decimal
-
-from django.db.models import F, Q, IntegerField, DecimalField, Value
+from django.db.models import Q, Sum
 from django.db.models.aggregates import Count
-from django.db.models.functions import Coalesce
+from django.utils import timezone
 from rest_framework import viewsets, permissions
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError, NotFound
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter, SearchFilter
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 from rest_framework.decorators import action
 
 
-from .filters import SearchQueryFilter
+from .buffers import buffer_metrics
+from .leaderboard import get_leaderboard, LeaderboardIds
+from .filters import SearchQueryFilter, ListingViewDailyFilter, ListingFunnelFilter
+from .rollups import summarize_keywords, summarize_params
+from ..core.permissions import AdminOnlyPermission
 from ..core.roles import is_renter, is_moderator, is_admin, is_lessor
-from ..statistics.models import SearchQueryStats, SearchQuery
-from ..statistics.serializers import SearchQueryStatsSerializer, SearchQuerySerializer
+from ..statistics.models import SearchQueryStats, SearchQuery, ListingViewDaily, ListingFunnelDaily
+from ..statistics.serializers import SearchQueryStatsSerializer, SearchQuerySerializer, ListingViewDailySerializer, \
+    ListingFunnelSerializer
 from ..listings.serializers import ListingSerializer
 from ..listings.models import Listing
 
@@ -34,42 +38,70 @@ class PopularSearchesViewSet(viewsets.ReadOnlyModelViewSet):
 
 @extend_schema(
     description=(
-        "List popular listings with aggregated counters.\n"
-        "Annotated fields in response:\n"
-        "- `views_cnt` (views), `reviews_cnt` (reviews), `rating_avg` (avg rating).\n"
+        "List popular listings ordered by the materialized `popularity` (views * 2 + reviews * 4)\n"
+        "and the Bayesian `rating_score` of ListingStats.\n"
         "Visibility rules:\n"
         "- anonymous / renter → only active\n"
         "- moderator / admin → all (active + inactive)\n"
-        "- lessor → only own (default) OR `?all=true` → active + own inactive"
+        "- lessor → only own (default) OR `?all=true` → active + own inactive\n"
+        "`?city=` - only listings of the city.\n"
+        "Anonymous/renter and moderator/admin lists are served from a materialized top-N leaderboard\n"
+        "(refreshed every LEADERBOARD_FRESH_SECONDS, stale-while-revalidate)."
     ),
     request=None,
     responses={200: OpenApiResponse(response=ListingSerializer, description="List of popular listings (paginated)")},
 )
 class PopularListingsViewSet(viewsets.ReadOnlyModelViewSet):
     """
-    GET /api/v1/statistics/popular/listings/ - list.
+    GET /api/v1/statistics/popular/listings/?city= - list.
     """
     serializer_class = ListingSerializer
     permission_classes = [permissions.AllowAny]
+    materialized = True
 
-    def get_queryset(self):
-        queryset = (
+    def leaderboard_class(self) -> str | None:
+        """
+        Visibility class of the materialized leaderboard (same rules as get_queryset), None - lessor lists.
+        """
+        user = self.request.user
+        if not user.is_authenticated or is_renter(user):
+            return "public"
+        if is_moderator(user) or is_admin(user):
+            return "all"
+        if is_lessor(user):
+            return None
+        return "public"
+
+    def list(self, request, *args, **kwargs):
+        visibility = self.leaderboard_class() if self.materialized else None
+        if visibility is None:
+            return super().list(request, *args, **kwargs)
+        ids = LeaderboardIds(get_leaderboard(visibility, request.query_params.get("city", "")), self.get_queryset())
+        page = self.paginate_queryset(ids)
+        listing_ids = page if page is not None else ids.ids
+        listings = self.get_queryset().in_bulk(listing_ids)
+        serializer = self.get_serializer([listings[pk] for pk in listing_ids if pk in listings], many=True)
+        if page is None:
+            return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
+
+    def ranked_queryset(self):
+        # stored columns + (is_active, -popularity) index of ListingStats, no per-row expressions
+        return (
             Listing.objects.select_related("owner", "listing_stats")
-            .annotate(
-                views_cnt=Coalesce(F("listing_stats__views_count"), Value(0), output_field=IntegerField()),
-                reviews_cnt=Coalesce(F("listing_stats__reviews_count"), Value(0), output_field=IntegerField()),
-                rating_avg=Coalesce(
-                    F("listing_stats__avg_rating"), Value(Decimal("0.00")),
-                    output_field=DecimalField(max_digits=3, decimal_places=2)
-                ),
-            )
-            .order_by("-views_cnt", "-reviews_cnt", "-rating_avg")
+            .order_by("-listing_stats__popularity", "-listing_stats__rating_score", "-pk")
         )
 
+    def get_queryset(self):
+        queryset = self.ranked_queryset()
+        city = self.request.query_params.get("city", "").strip()
+        if city:
+            queryset = queryset.filter(city__iexact=city)
+
         user = self.request.user
         # anonymous/RENTER: active only
         if not user.is_authenticated or is_renter(user):
-            return queryset.filter(is_active=True)
+            return queryset.filter(listing_stats__is_active=True)
         # MODERATOR/ADMIN all (active + inactive)
         if is_moderator(user) or is_admin(user):
             return queryset
@@ -78,12 +110,69 @@ class PopularListingsViewSet(viewsets.ReadOnlyModelViewSet):
             all_flag = self.request.query_params.get("all", "").lower() in {"1", "true", "yes", "y"}
             if all_flag:
                 # all active + your own inactive
-                return queryset.filter(Q(is_active=True) | Q(owner_id=user.id, is_active=False))
+                return queryset.filter(Q(listing_stats__is_active=True) | Q(owner_id=user.id))
             # default - only your own (active + inactive)
             return queryset.filter(owner_id=user.id)
 
         # default: only active
-        return queryset.filter(is_active=True)
+        return queryset.filter(listing_stats__is_active=True)
+
+
+@extend_schema(
+    description=(
+        "List trending listings ordered by the time-decayed `trending` score of ListingStats\n"
+        "(views and bookings, half-life TRENDING_HALF_LIFE_HOURS); listings without events are not listed.\n"
+        "Visibility rules as for popular listings."
+    ),
+    request=None,
+    responses={200: OpenApiResponse(response=ListingSerializer, description="List of trending listings (paginated)")},
+)
+class TrendingListingsViewSet(PopularListingsViewSet):
+    """
+    GET /api/v1/statistics/trending/listings/?city= - list.
+    """
+    materialized = False
+
+    def ranked_queryset(self):
+        # (is_active, trending) index of ListingStats
+        return (
+            Listing.objects.select_related("owner", "listing_stats")
+            .filter(listing_stats__trending__isnull=False)
+            .order_by("-listing_stats__trending", "-pk")
+        )
+
+
+@extend_schema(
+    summary="Trending search keywords of the last hour/day.",
+    description=(
+        "Query params: `window` = hour | day (default), `limit` (1..100, default 20).\n"
+        "Counted from the hourly search rollups (raw rows only for the partial hour at the edge)."
+    ),
+    request=None,
+    responses={200: OpenApiResponse(description="[{keywords, count}] ordered by count desc")},
+)
+class TrendingSearchesViewSet(viewsets.ViewSet):
+    """
+    GET /api/v1/statistics/trending/searches/?window=hour|day&limit= - list.
+    """
+    permission_classes = [permissions.AllowAny]
+    WINDOWS = {"hour": timezone.timedelta(hours=1), "day": timezone.timedelta(days=1)}
+
+    def list(self, request):
+        window = request.query_params.get("window", "day")
+        if window not in self.WINDOWS:
+            raise ValidationError({"window": f"One of: {', '.join(self.WINDOWS)}."})
+        try:
+            limit = min(max(int(request.query_params.get("limit", 20)), 1), 100)
+        except ValueError:
+            raise ValidationError({"limit": "Must be an integer."})
+        data = summarize_keywords(timezone.now() - self.WINDOWS[window], None)
+        return Response([item for item in data if item["keywords"]][:limit])
+
+
+# filters of the search summary that the keyword rollups can't answer (counted over the raw rows)
+ROLLUP_UNSUPPORTED_FILTERS = {"param", "param_value", "search"}
+
 
 @extend_schema(
     description=(
@@ -102,8 +191,9 @@ class SearchQueryViewSet(viewsets.ReadOnlyModelViewSet):
     """
     GET /api/v1/statistics/searches/?keyword=<substr>&date_from=&date_to=&param=&param_value=?ordering=-created_at
     GET /api/v1/statistics/searches/summary/?same_filters...  -  [{"keywords":"...", "count": N}, ...]
+    GET /api/v1/statistics/searches/summary/params/?date_from=&date_to=&param=  -  [{"key", "value", "count"}, ...]
     """
-    queryset = SearchQuery.objects.all().order_by("-created_at")
+    queryset = SearchQuery.objects.select_related("param_set").order_by("-created_at")
     serializer_class = SearchQuerySerializer
     permission_classes = [permissions.AllowAny]
     filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
@@ -115,6 +205,8 @@ class SearchQueryViewSet(viewsets.ReadOnlyModelViewSet):
     @extend_schema(
         description=(
                 "Aggregated popular keywords subject to the same filters as list endpoint.\n"
+                "`keyword`, `date_from`, `date_to` are answered from the hourly/daily rollups (raw rows only\n"
+                "for the partial hours at the edges), `param`/`search` filters are counted over the raw rows.\n"
                 "Response: array of objects `{keywords, count}` ordered by `count desc`."
         ),
         request=None,
@@ -133,7 +225,173 @@ class SearchQueryViewSet(viewsets.ReadOnlyModelViewSet):
     )
     @action(detail=False, methods=["GET"], url_path="summary")
     def summary(self, request):
+        if not ROLLUP_UNSUPPORTED_FILTERS & set(request.query_params):
+            filters = self._range_filters()
+            return Response(summarize_keywords(filters["date_from"], filters["date_to"], filters["keyword"]))
         queryset = self.filter_queryset(self.get_queryset())
         data = (queryset.values("keywords").annotate(count=Count("id")).order_by("-count", "-keywords"))
         return Response(list(data))
 
+    @extend_schema(
+        description=(
+                "Counts of search param key/values from the hourly/daily rollups.\n"
+                "Query params: `date_from`, `date_to`, `param` (only this key).\n"
+                "Response: array of objects `{key, value, count}` ordered by `count desc`."
+        ),
+        request=None,
+        responses={200: OpenApiResponse(description="Aggregated search params")},
+    )
+    @action(detail=False, methods=["GET"], url_path="summary/params")
+    def summary_params(self, request):
+        filters = self._range_filters()
+        return Response(summarize_params(filters["date_from"], filters["date_to"], filters["param"]))
+
+    def _range_filters(self) -> dict:
+        filterset = self.filterset_class(self.request.query_params, queryset=self.get_queryset())
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        return filterset.form.cleaned_data
+
+
+
+@extend_schema(
+    description=(
+        "Views of listings per day (daily rollups, updated by `manage.py rollup_views`;\n"
+        "`unique_visitors` - HyperLogLog estimate, updated on every write of the views).\n"
+        "Query params: `listing`, `date_from`, `date_to` (YYYY-MM-DD).\n"
+        "Visibility: moderator / admin → all listings, lessor → own listings, others → none."
+    ),
+    request=None,
+    responses={200: OpenApiResponse(response=ListingViewDailySerializer, description="Daily views (paginated)")},
+)
+class ListingViewDailyViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    GET /api/v1/statistics/views/daily/?listing=&date_from=&date_to=
+    """
+    serializer_class = ListingViewDailySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ListingViewDailyFilter
+
+    def get_queryset(self):
+        queryset = ListingViewDaily.objects.order_by("-day", "listing_id")
+        user = self.request.user
+        if is_moderator(user) or is_admin(user):
+            return queryset
+        if is_lessor(user):
+            return queryset.filter(listing__owner_id=user.id)
+        return queryset.none()
+
+    @extend_schema(
+        summary="Estimated unique visitors of a listing over the last `days` days (HyperLogLog).",
+        description=(
+            "Query params: `listing` (required), `days` (1..365, default 7).\n"
+            "Union of the daily visitor sketches, standard error ~3 %."
+        ),
+        request=None,
+        responses={200: OpenApiResponse(description="{listing, days, date_from, date_to, unique_visitors}")},
+    )
+    @action(detail=False, methods=["GET"], url_path="unique-visitors")
+    def unique_visitors(self, request):
+        try:
+            listing_id = int(request.query_params.get("listing", ""))
+            days = int(request.query_params.get("days", 7))
+        except ValueError:
+            raise ValidationError({"detail": "`listing` and `days` must be integers."})
+        if not 1 <= days <= 365:
+            raise ValidationError({"days": "Must be between 1 and 365."})
+        user = request.user
+        listings = Listing.objects.filter(pk=listing_id)
+        if not (is_moderator(user) or is_admin(user)):
+            listings = listings.filter(owner_id=user.id) if is_lessor(user) else listings.none()
+        if not listings.exists():
+            raise NotFound("Listing not found.")
+        date_to = timezone.localdate()
+        date_from = date_to - timezone.timedelta(days=days - 1)
+        return Response({
+            "listing": listing_id,
+            "days": days,
+            "date_from": date_from,
+            "date_to": date_to,
+            "unique_visitors": ListingViewDaily.estimate_visitors(listing_id, date_from, date_to),
+        })
+
+
+@extend_schema(
+    description=(
+        "View-to-booking funnel per listing summed over a date range (daily funnel table, GROUP BY in SQL).\n"
+        "Query params: `date_from`, `date_to` (YYYY-MM-DD), `listing`, `no_bookings=true` (viewed, never booked).\n"
+        "Visibility: lessor → own listings, moderator / admin → all listings, others → none.\n"
+        "Ordered by views desc; `view_to_booking` = bookings_created / unique_viewers (null without unique viewers:\n"
+        "views of days whose raw rows were purged before the deploy have no unique viewer counts)."
+    ),
+    request=None,
+    responses={200: OpenApiResponse(response=ListingFunnelSerializer, description="Funnel per listing (paginated)")},
+)
+class ListingFunnelViewSet(viewsets.GenericViewSet):
+    """
+    GET /api/v1/statistics/funnel/?date_from=&date_to=&listing=&no_bookings=
+    """
+    serializer_class = ListingFunnelSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ListingFunnelFilter
+
+    def get_queryset(self):
+        queryset = ListingFunnelDaily.objects.all()
+        user = self.request.user
+        if is_moderator(user) or is_admin(user):
+            return queryset
+        if is_lessor(user):
+            return queryset.filter(listing__owner_id=user.id)
+        return queryset.none()
+
+    def list(self, request):
+        queryset = (self.filter_queryset(self.get_queryset())
+                    .values("listing_id", "listing__title")
+                    .annotate(**{field: Sum(field) for field in ListingFunnelDaily.COUNTERS})
+                    .order_by("-views", "listing_id"))
+        if request.query_params.get("no_bookings", "").lower() in {"1", "true", "yes", "y"}:
+            queryset = queryset.filter(bookings_created=0)
+        page = self.paginate_queryset(queryset)
+        rows = self._with_unique_viewers(list(page if page is not None else queryset))
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(rows, many=True).data)
+        return Response(self.get_serializer(rows, many=True).data)
+
+    def _with_unique_viewers(self, rows):
+        """
+        unique_viewers of the range - union of the daily visitor sketches (not a sum of the daily estimates).
+        """
+        dates = self.filterset_class(self.request.query_params).form
+        dates.is_valid()
+        unique_viewers = ListingViewDaily.estimate_visitors_many(
+            [row["listing_id"] for row in rows],
+            dates.cleaned_data.get("date_from"),
+            dates.cleaned_data.get("date_to"),
+        )
+        for row in rows:
+            row["unique_viewers"] = unique_viewers[row["listing_id"]]
+        return rows
+
+
+@extend_schema(
+    summary="Write-behind buffers of statistics (admin only).",
+    description=(
+        "Per buffer (views, searches) of this worker process:\n"
+        "- `depth` - events waiting for a flush, `max_queue` - bound of the queue\n"
+        "- `dropped` - events dropped because the queue was full\n"
+        "- `written`/`failed` - events written / lost by failed flushes, `flushes` - number of flushes\n"
+        "- `last_flush_ms`, `max_flush_ms` - flush latency"
+    ),
+    request=None,
+    responses={200: OpenApiResponse(description="Buffer metrics")},
+)
+class StatsMetricsViewSet(viewsets.ViewSet):
+    """
+    GET /api/v1/statistics/metrics/ - list.
+    """
+    permission_classes = [AdminOnlyPermission]
+
+    def list(self, request):
+        return Response(buffer_metrics())
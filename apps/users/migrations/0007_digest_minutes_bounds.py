@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:49
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def clamp_digest_minutes(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    User.objects.filter(digest_minutes__lt=5).update(digest_minutes=5)
+    User.objects.filter(digest_minutes__gt=10080).update(digest_minutes=10080)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_user_digest_minutes_user_notification_mode'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='digest_minutes',
+            field=models.PositiveIntegerField(default=60, validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(10080)], verbose_name='Digest interval (minutes)'),
+        ),
+        migrations.RunPython(clamp_digest_minutes, migrations.RunPython.noop),
+    ]
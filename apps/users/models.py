@@ -1,15 +1,23 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 from django.db.models.query_utils import Q
 from django.utils.translation import gettext_lazy as _
 
-from ..core.enums import Roles
+from ..core.enums import Roles, NotificationMode
 
 
 class User(AbstractUser):
     email = models.EmailField(_("email address"), unique=True)
     role = models.CharField(max_length=20, choices=Roles.choices, verbose_name=_("Role"))
     nickname = models.CharField(_("nickname"), max_length=30, blank=True, null=True, help_text=_("Visible to others"))
+    notification_mode = models.CharField(max_length=10, choices=NotificationMode.choices,
+                                         default=NotificationMode.IMMEDIATE, verbose_name=_("Notification mode"))
+    digest_minutes = models.PositiveIntegerField(
+        default=60,
+        validators=[MinValueValidator(5), MaxValueValidator(7 * 24 * 60)],  # 5 minutes .. one week
+        verbose_name=_("Digest interval (minutes)"),
+    )
 
     USERNAME_FIELD = "email"
     EMAIL_FIELD = "email"
@@ -101,5 +101,6 @@ class UserLoggedInSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = User
-        fields = ("id", "email", "username", "first_name", "last_name", "role", "nickname")
-        read_only_fields = fields
\ No newline at end of file
+        fields = ("id", "email", "username", "first_name", "last_name", "role", "nickname",
+                  "notification_mode", "digest_minutes")
+        read_only_fields = ("id", "email", "username", "first_name", "last_name", "role", "nickname")
\ No newline at end of file
@@ -198,4 +198,25 @@ def test_checking_impossible_pets():
     renter = _login_renter()
     payload = {"listing": str(listing_id), "start_date": start, "end_date": end, "pets": Availability.YES}
     resp = renter.sess.post(f"{BASE_URL}/bookings/", json=payload)
-    assert resp.status_code in (400, 409), resp.text
\ No newline at end of file
+    assert resp.status_code in (400, 409), resp.text
+
+@pytest.mark.integration
+def test_listing_availability_filter_excludes_approved_dates():
+    start, end, days = future_time()
+    marker = f"availability{date.today().toordinal()}{days}x{start.replace('-', '')}"
+    lessor, listing_id = create_listing_as_lessor(
+        f"Flat {marker}",
+        span_days_min=days,
+        span_days_max=days + 30,
+    )
+    renter = _login_renter()
+    booking_id = create_pending_booking(renter, listing_id, start, end)
+    lessor.approve_booking(booking_id)
+
+    def found(check_in, check_out):
+        page = renter.list_listings(search=marker, check_in=check_in, check_out=check_out)
+        return listing_id in [item["id"] for item in page.get("results", page)]
+
+    # overlapping range -> busy; the check-out day and later -> free
+    assert not found(str(date.fromisoformat(start) + timedelta(days=1)), str(date.fromisoformat(end) + timedelta(days=3)))
+    assert found(end, str(date.fromisoformat(end) + timedelta(days=2)))
@@ -1,9 +1,12 @@
+import json
 import pytest
 import random
+from base64 import urlsafe_b64encode
 from faker import Faker
 
 from apps.core.users_seed_test import BASE_URL, email_for
-from .rental_api import RentalApi, create_listing_as_lessor, future_time, _login_renter, _login_admin, _login_lessor
+from .rental_api import RentalApi, create_listing_as_lessor, future_time, _login_renter, _login_admin, _login_lessor, \
+    create_pending_booking
 from apps.core.enums import TypesHousing
 
 fake = Faker()
@@ -181,3 +184,157 @@ def test_update_forbidden_for_renter():
     # PATCH
     renter_patch = renter.update_listing_patch(listing_id, {"is_active": False})
     assert renter_patch.status_code in (403, 404)
+
+@pytest.mark.integration
+def test_search_listings_german_word_forms():
+    # lessor creates a listing with a german title
+    marker = fake.pystr(min_chars=10, max_chars=10).lower()
+    title = f"Gemütliche Wohnungen {marker} in München"
+    lessor, listing_id = create_listing_as_lessor(title)
+
+    # another word form and umlaut spelling must find it
+    anonymous = RentalApi(BASE_URL)
+    page = anonymous.list_listings(search=f"wohnung MUENCHEN {marker}")
+    results = page.get("results", page)
+    assert [item["id"] for item in results] == [listing_id]
+
+@pytest.mark.integration
+def test_list_listings_cursor_pagination():
+    anonymous = RentalApi(BASE_URL)
+    page = anonymous.list_listings(pagination="cursor", ordering="-created_at", page_size=2)
+    assert "count" not in page and "next" in page
+    ids = [item["id"] for item in page["results"]]
+    for _ in range(3):
+        if not page["next"]:
+            break
+        resp = anonymous.sess.get(page["next"])
+        assert resp.status_code == 200, resp.text
+        page = resp.json()
+        ids += [item["id"] for item in page["results"]]
+    # keyset pages do not overlap and keep the ordering
+    assert len(ids) == len(set(ids))
+    assert ids == sorted(ids, reverse=True)
+
+@pytest.mark.integration
+def test_list_listings_forged_cursor():
+    anonymous = RentalApi(BASE_URL)
+    for position in ([{"x": 1}, 1], ["not a date", 1], ["2025-01-01T00:00:00", "x"]):
+        cursor = {"p": position, "r": 0, "o": ["-created_at", "-pk"]}
+        encoded = urlsafe_b64encode(json.dumps(cursor).encode()).decode("ascii")
+        resp = anonymous.sess.get(f"{BASE_URL}/listings/", params={"cursor": encoded, "ordering": "-created_at"})
+        assert resp.status_code == 404, resp.text
+
+@pytest.mark.integration
+def test_statistics_buffer_metrics_admin_only():
+    # a search goes to the write-behind buffer of search history
+    anonymous = RentalApi(BASE_URL)
+    anonymous.list_listings(search=fake.word())
+    resp = anonymous.sess.get(f"{BASE_URL}/statistics/metrics/")
+    assert resp.status_code in (401, 403), resp.text
+
+    admin = _login_admin()
+    resp = admin.sess.get(f"{BASE_URL}/statistics/metrics/")
+    assert resp.status_code == 200, resp.text
+    metrics = {item["name"]: item for item in resp.json()}
+    assert {"views", "searches"} <= set(metrics)
+    assert {"depth", "dropped", "last_flush_ms"} <= set(metrics["searches"])
+
+@pytest.mark.integration
+def test_listing_rating_histogram():
+    lessor, listing_id = create_listing_as_lessor()
+    anonymous = RentalApi(BASE_URL)
+    resp = anonymous.get_listing(listing_id)
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["rating_histogram"] == {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
+    page = anonymous.list_listings(ordering="-created_at")
+    assert all("rating_histogram" in item for item in page.get("results", page))
+
+@pytest.mark.integration
+def test_listing_unique_visitors_owner_only():
+    lessor, listing_id = create_listing_as_lessor()
+    RentalApi(BASE_URL).get_listing(listing_id)
+    url = f"{BASE_URL}/statistics/views/daily/unique-visitors/"
+    resp = lessor.sess.get(url, params={"listing": listing_id, "days": 30})
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["days"] == 30
+    assert isinstance(resp.json()["unique_visitors"], int)
+    resp = lessor.sess.get(url, params={"listing": listing_id, "days": 0})
+    assert resp.status_code == 400, resp.text
+    renter = _login_renter()
+    resp = renter.sess.get(url, params={"listing": listing_id})
+    assert resp.status_code == 404, resp.text
+
+@pytest.mark.integration
+def test_search_summary_from_rollups():
+    anonymous = RentalApi(BASE_URL)
+    params = {"date_from": "2020-01-01T10:30:00", "date_to": future_time()[1]}
+    resp = anonymous.sess.get(f"{BASE_URL}/statistics/searches/summary/", params=params)
+    assert resp.status_code == 200, resp.text
+    assert all({"keywords", "count"} <= set(item) for item in resp.json())
+    resp = anonymous.sess.get(f"{BASE_URL}/statistics/searches/summary/params/", params={"param": "city"})
+    assert resp.status_code == 200, resp.text
+    assert all(item["key"] == "city" for item in resp.json())
+    resp = anonymous.sess.get(f"{BASE_URL}/statistics/searches/summary/", params={"date_from": "not-a-date"})
+    assert resp.status_code == 400, resp.text
+
+@pytest.mark.integration
+def test_trending_listings_booking_raises_score():
+    start, end, days = future_time()
+    lessor, listing_id = create_listing_as_lessor(span_days_min=days, span_days_max=days + 30, quests_max=4)
+    resp = lessor.sess.get(f"{BASE_URL}/statistics/trending/listings/")
+    assert resp.status_code == 200, resp.text
+    page = resp.json()
+    assert listing_id not in [item["id"] for item in page.get("results", page)]
+
+    create_pending_booking(_login_renter(), listing_id, start, end, guests=2)
+    resp = lessor.sess.get(f"{BASE_URL}/statistics/trending/listings/")
+    assert resp.status_code == 200, resp.text
+    page = resp.json()
+    assert listing_id in [item["id"] for item in page.get("results", page)]
+
+@pytest.mark.integration
+def test_trending_searches_window():
+    anonymous = RentalApi(BASE_URL)
+    resp = anonymous.sess.get(f"{BASE_URL}/statistics/trending/searches/", params={"window": "hour", "limit": 5})
+    assert resp.status_code == 200, resp.text
+    assert len(resp.json()) <= 5
+    resp = anonymous.sess.get(f"{BASE_URL}/statistics/trending/searches/", params={"window": "week"})
+    assert resp.status_code == 400, resp.text
+
+@pytest.mark.integration
+def test_search_keywords_normalized_share_cache():
+    anonymous = RentalApi(BASE_URL)
+    word = fake.word()
+    first = anonymous.list_listings(search=f" {word.upper()}  ", ordering="-created_at")
+    second = anonymous.list_listings(search=f"the {word}", ordering="-created_at")
+    assert first == second
+
+@pytest.mark.integration
+def test_popular_listings_leaderboard_by_city():
+    lessor, listing_id = create_listing_as_lessor()
+    city = lessor.sess.get(f"{BASE_URL}/listings/{listing_id}/").json()["city"]
+    anonymous = RentalApi(BASE_URL)
+    resp = anonymous.sess.get(f"{BASE_URL}/statistics/popular/listings/", params={"city": city.upper()})
+    assert resp.status_code == 200, resp.text
+    page = resp.json()
+    assert all(item["city"].lower() == city.lower() for item in page.get("results", page))
+    admin = _login_admin()
+    resp = admin.sess.get(f"{BASE_URL}/statistics/popular/listings/", params={"page_size": 5})
+    assert resp.status_code == 200, resp.text
+    assert len(resp.json()["results"]) <= 5
+
+@pytest.mark.integration
+def test_listing_funnel_lessor_scoped():
+    start, end, days = future_time()
+    lessor, listing_id = create_listing_as_lessor(span_days_min=days, span_days_max=days + 30, quests_max=4)
+    renter = _login_renter()
+    create_pending_booking(renter, listing_id, start, end, guests=2)
+    resp = lessor.sess.get(f"{BASE_URL}/statistics/funnel/", params={"listing": listing_id})
+    assert resp.status_code == 200, resp.text
+    rows = resp.json()["results"]
+    assert len(rows) == 1 and rows[0]["bookings_created"] == 1, rows
+    resp = lessor.sess.get(f"{BASE_URL}/statistics/funnel/", params={"listing": listing_id, "no_bookings": "true"})
+    assert resp.json()["results"] == []
+    resp = renter.sess.get(f"{BASE_URL}/statistics/funnel/", params={"listing": listing_id})
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["results"] == []
@@ -0,0 +1,49 @@
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.core.enums import Roles
+from apps.listings.models import Listing
+from apps.statistics.models import ListingFunnelDaily, ListingViewDaily
+from apps.users.models import User
+
+# DB-level tests (pytest-django test database, in-process client): states the live server can't be brought to
+
+
+@pytest.mark.django_db
+def test_popular_listings_leaderboard_pages_past_cap(settings):
+    # pages past the capped leaderboard come from the database, count is the real one
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    settings.LEADERBOARD_SIZE = 2
+    lessor = User.objects.create_user(username="board_lessor", email="board_lessor@example.com",
+                                      password="Pa$$w0rd", role=Roles.LESSOR)
+    created = {Listing.objects.create(owner=lessor, title=f"Board {i}", location=f"Main St {i}", city="Teststadt").id
+               for i in range(3)}
+    client = APIClient()
+    seen = set()
+    for page in (1, 2, 3):
+        resp = client.get("/api/v1/statistics/popular/listings/",
+                          {"city": "TESTSTADT", "page_size": 1, "page": page})
+        assert resp.status_code == 200, resp.content
+        body = resp.json()
+        assert body["count"] == 3 and len(body["results"]) == 1, body
+        seen.add(body["results"][0]["id"])
+    assert seen == created
+
+
+@pytest.mark.django_db
+def test_listing_funnel_unique_viewers_over_days():
+    # the same visitor on two days is one unique viewer of the range
+    lessor = User.objects.create_user(username="funnel_lessor", email="funnel_lessor@example.com",
+                                      password="Pa$$w0rd", role=Roles.LESSOR)
+    listing = Listing.objects.create(owner=lessor, title="Funnel", location="Main St 1", city="Berlin")
+    today = timezone.localdate()
+    for day in (today - timezone.timedelta(days=1), today):
+        ListingFunnelDaily.add_events(day, {listing.id: {"views": 1}})
+        ListingFunnelDaily.set_unique_viewers(day, ListingViewDaily.add_visitors(day, {listing.id: {"v:visitor"}}))
+    client = APIClient()
+    client.force_authenticate(lessor)
+    resp = client.get("/api/v1/statistics/funnel/", {"listing": listing.id})
+    assert resp.status_code == 200, resp.content
+    rows = resp.json()["results"]
+    assert len(rows) == 1 and rows[0]["views"] == 2 and rows[0]["unique_viewers"] == 1, rows
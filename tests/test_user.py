@@ -0,0 +1,15 @@
+import pytest
+
+from .rental_api import _login_renter
+from apps.core.users_seed_test import BASE_URL
+
+
+@pytest.mark.integration
+def test_digest_minutes_bounds():
+    renter = _login_renter()
+    for minutes in (0, -5, 7 * 24 * 60 + 1):
+        resp = renter.sess.patch(f"{BASE_URL}/user/me/", json={"digest_minutes": minutes})
+        assert resp.status_code == 400, resp.text
+    resp = renter.sess.patch(f"{BASE_URL}/user/me/", json={"digest_minutes": 30})
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["digest_minutes"] == 30